@@ -0,0 +1,48 @@
+"""临时邮箱客户端
+
+服务商模块及其依赖（httpx 等）只在首次使用时导入::
+
+    import temp_mail
+
+    client = temp_mail.get_client("mail_tm")
+"""
+import importlib
+
+from temp_mail.registry import available_providers, get_client, get_provider_class, register_provider
+
+__all__ = [
+    "available_providers",
+    "get_client",
+    "get_provider_class",
+    "register_provider",
+    "MailClientABC",
+    "MailClientError",
+    "MailData",
+    "MailTM",
+    "MailCX",
+    "TempMailLOL",
+    "GuerrillaMail",
+    "IDataRiverClient",
+    "SyncMailClient",
+]
+
+_LAZY_ATTRS = {
+    "MailClientABC": "temp_mail.client",
+    "MailClientError": "temp_mail.client",
+    "MailData": "temp_mail.client",
+    "MailTM": "temp_mail.mail_tm",
+    "MailCX": "temp_mail.mail_cx",
+    "TempMailLOL": "temp_mail.tempmail_lol",
+    "GuerrillaMail": "temp_mail.guerrilla_mail",
+    "IDataRiverClient": "temp_mail.idatariver",
+    "SyncMailClient": "temp_mail.sync_client",
+}
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'temp_mail' has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,328 @@
+import asyncio
+import base64
+import gzip
+import json
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator, Optional
+
+import httpx
+
+from temp_mail.client import MailClientError
+from temp_mail.transport import aclose_async_client, get_transport_factory, set_transport_factory
+
+# 录制时从 URL 中脱敏的查询参数，回放时同样脱敏后再匹配；
+# 邮件 id 等非凭据参数不能脱敏，否则回放时不同邮件的请求无法区分
+SCRUB_PARAMS = ("apikey", "token", "sid_token")
+# 录制时从 JSON 响应体中脱敏的键（任意层级）
+SCRUB_KEYS = ("token", "sid_token", "apikey")
+# 录制时只保留 Cookie 名称、值被替换的响应头
+SCRUB_COOKIE_HEADERS = ("set-cookie",)
+# 响应体以解码后的形式保存，这些响应头不再适用
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+def _scrub_url(url: httpx.URL, scrub_params: tuple[str, ...]) -> str:
+    params = [(k, "***" if k in scrub_params else v) for k, v in url.params.multi_items()]
+    return str(url.copy_with(params=params))
+
+
+def _scrub_json(value: object, scrub_keys: tuple[str, ...], found: set[str]) -> object:
+    if isinstance(value, dict):
+        scrubbed = {}
+        for k, v in value.items():
+            if k in scrub_keys:
+                if isinstance(v, str) and v:
+                    found.add(v)
+                scrubbed[k] = "***"
+            else:
+                scrubbed[k] = _scrub_json(v, scrub_keys, found)
+        return scrubbed
+    if isinstance(value, list):
+        return [_scrub_json(v, scrub_keys, found) for v in value]
+    return value
+
+
+def _scrub_body(content: bytes, scrub_keys: tuple[str, ...], found: set[str]) -> bytes:
+    """脱敏 JSON 响应体，被替换的值加入 found"""
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return content
+    if isinstance(data, str):
+        # 整个响应体是一个 JSON 字符串，如 Mail.cx authorize_token 直接返回令牌
+        if data:
+            found.add(data)
+        return b'"***"'
+    scrubbed = _scrub_json(data, scrub_keys, found)
+    if scrubbed == data:
+        return content
+    return json.dumps(scrubbed, ensure_ascii=False).encode("utf-8")
+
+
+def _scrub_cookie(value: str, found: set[str]) -> str:
+    # "PHPSESSID=abc; path=/" -> "PHPSESSID=***; path=/"，保留名称以便回放时按原流程解析
+    cookie, sep, attributes = value.partition(";")
+    name, eq, secret = cookie.partition("=")
+    if not eq:
+        return value
+    if secret:
+        found.add(secret)
+    return f"{name}{eq}***{sep}{attributes}"
+
+
+def _request_secrets(request: httpx.Request, scrub_params: tuple[str, ...]) -> set[str]:
+    # 请求中携带的凭据：脱敏的查询参数、Bearer 令牌和 Cookie 的值
+    secrets = {v for k, v in request.url.params.multi_items() if k in scrub_params and v}
+    authorization = request.headers.get("authorization", "")
+    _, _, credential = authorization.partition(" ")
+    if credential:
+        secrets.add(credential)
+    for cookie in request.headers.get_list("cookie"):
+        for part in cookie.split(";"):
+            _, eq, value = part.partition("=")
+            if eq and value.strip():
+                secrets.add(value.strip())
+    return secrets
+
+
+# 过短的值（如 "1"）替换后会误伤正常内容
+_MIN_SECRET_LENGTH = 8
+
+
+class Cassette:
+    """录制的服务商 HTTP 交互
+
+    以 gzip 压缩的 JSON Lines 文件保存，每行一次请求/响应，
+    可在没有网络的环境中回放，用于可重复的解析和吞吐量回归测试。
+    写入磁带前脱敏：查询参数、JSON 响应体中的令牌键、整个响应体为 JSON 字符串时的内容和 Set-Cookie 的值
+    被替换为 ``***``；这些值以及请求携带的 Bearer 令牌、Cookie 一旦出现过，之后在任何响应体和响应头中出现也会被替换。
+    磁带可以提交到仓库。
+    只记录每个响应的耗时，不记录请求之间的间隔。
+
+    Args:
+        path: 磁带文件路径，建议使用 .jsonl.gz 后缀
+        scrub_params: 需要脱敏的查询参数
+        scrub_keys: 需要脱敏的 JSON 响应体键
+    """
+
+    def __init__(self, path: str, scrub_params: tuple[str, ...] = SCRUB_PARAMS,
+                 scrub_keys: tuple[str, ...] = SCRUB_KEYS):
+        self.path = path
+        self.scrub_params = scrub_params
+        self.scrub_keys = scrub_keys
+        self.interactions: list[dict] = []
+        # 录制过程中见过的凭据
+        self._secrets: set[str] = set()
+
+    @classmethod
+    def load(cls, path: str, scrub_params: tuple[str, ...] = SCRUB_PARAMS,
+             scrub_keys: tuple[str, ...] = SCRUB_KEYS) -> "Cassette":
+        """从文件加载磁带"""
+        cassette = cls(path, scrub_params, scrub_keys)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                cassette.interactions = [json.loads(line) for line in f if line.strip()]
+        except OSError as e:
+            raise MailClientError(f"加载磁带失败: {str(e)}") from e
+        return cassette
+
+    def save(self) -> None:
+        """把录制的交互写入文件"""
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            for interaction in self.interactions:
+                f.write(json.dumps(interaction, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def record(self, request: httpx.Request, response: httpx.Response, elapsed: float) -> None:
+        """脱敏后记录一次交互"""
+        found = _request_secrets(request, self.scrub_params)
+        content = _scrub_body(response.content, self.scrub_keys, found)
+        headers = [
+            [k, _scrub_cookie(v, found) if k.lower() in SCRUB_COOKIE_HEADERS else v]
+            for k, v in response.headers.multi_items() if k.lower() not in _DROP_HEADERS
+        ]
+        self._secrets.update(s for s in found if len(s) >= _MIN_SECRET_LENGTH)
+        for secret in self._secrets:
+            content = content.replace(secret.encode("utf-8"), b"***")
+            headers = [[k, v.replace(secret, "***")] for k, v in headers]
+        try:
+            body = {"text": content.decode("utf-8")}
+        except UnicodeDecodeError:
+            body = {"base64": base64.b64encode(content).decode("ascii")}
+        self.interactions.append({
+            "method": request.method,
+            "url": _scrub_url(request.url, self.scrub_params),
+            "elapsed": round(elapsed, 6),
+            "status": response.status_code,
+            "headers": headers,
+            **body,
+        })
+
+    def recording_transport(self, proxy: Optional[str] = None) -> "RecordingTransport":
+        """创建录制传输层，请求真实发送并记录到磁带"""
+        return RecordingTransport(self, httpx.AsyncHTTPTransport(proxy=proxy))
+
+    def replay_transport(self, realtime: bool = False) -> "ReplayTransport":
+        """创建回放传输层
+
+        Args:
+            realtime: 是否按录制时每个响应的耗时回放，False 表示以最快速度回放；
+                请求之间的间隔由场景本身决定，不会回放
+        """
+        return ReplayTransport(self, realtime)
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """把经过的请求和响应记录到磁带的传输层"""
+
+    def __init__(self, cassette: Cassette, transport: httpx.AsyncBaseTransport):
+        self.cassette = cassette
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.monotonic()
+        response = await self.transport.handle_async_request(request)
+        content = await response.aread()
+        elapsed = time.monotonic() - started
+        await response.aclose()
+        recorded = httpx.Response(
+            response.status_code,
+            headers=[(k, v) for k, v in response.headers.multi_items() if k.lower() not in _DROP_HEADERS],
+            content=content,
+            request=request,
+        )
+        self.cassette.record(request, recorded, elapsed)
+        return recorded
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """从磁带回放响应的传输层，不访问网络
+
+    优先返回方法和 URL 都相同的第一条未使用交互；
+    URL 中带有随机地址等无法精确匹配时，按录制顺序返回同一主机上第一条未使用的同方法交互。
+    两种匹配都按录制顺序建立索引，每次请求的匹配开销与磁带长度无关。
+    """
+
+    def __init__(self, cassette: Cassette, realtime: bool = False):
+        self.cassette = cassette
+        self.realtime = realtime
+        self._used = [False] * len(cassette.interactions)
+        self._by_url: defaultdict[tuple[str, str], deque[int]] = defaultdict(deque)
+        self._by_host: defaultdict[tuple[str, str], deque[int]] = defaultdict(deque)
+        for i, interaction in enumerate(cassette.interactions):
+            self._by_url[(interaction["method"], interaction["url"])].append(i)
+            self._by_host[(interaction["method"], httpx.URL(interaction["url"]).host)].append(i)
+
+    def _first_unused(self, queue: Optional[deque[int]]) -> int:
+        # 已被另一种匹配方式使用的交互在这里惰性移除
+        while queue:
+            if not self._used[queue[0]]:
+                return queue.popleft()
+            queue.popleft()
+        return -1
+
+    def _match(self, request: httpx.Request) -> int:
+        url = _scrub_url(request.url, self.cassette.scrub_params)
+        index = self._first_unused(self._by_url.get((request.method, url)))
+        if index < 0:
+            index = self._first_unused(self._by_host.get((request.method, request.url.host)))
+        if index < 0:
+            raise MailClientError(f"磁带中没有匹配的交互: {request.method} {url}")
+        return index
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        index = self._match(request)
+        self._used[index] = True
+        interaction = self.cassette.interactions[index]
+        if self.realtime and interaction["elapsed"]:
+            await asyncio.sleep(interaction["elapsed"])
+        if "base64" in interaction:
+            content = base64.b64decode(interaction["base64"])
+        else:
+            content = interaction["text"].encode("utf-8")
+        return httpx.Response(
+            interaction["status"],
+            headers=interaction["headers"],
+            content=content,
+            request=request,
+        )
+
+    @property
+    def remaining(self) -> int:
+        """尚未回放的交互数量"""
+        return self._used.count(False)
+
+
+@contextmanager
+def use_cassette(path: str, mode: str = "replay", realtime: bool = False) -> Iterator[Cassette]:
+    """在上下文中录制或回放所有服务商请求
+
+    用法::
+
+        with use_cassette("mail_tm.jsonl.gz", mode="record"):
+            asyncio.run(scenario())
+
+        with use_cassette("mail_tm.jsonl.gz"):
+            asyncio.run(scenario())
+
+    Args:
+        path: 磁带文件路径
+        mode: "record" 录制，"replay" 回放
+        realtime: 回放时是否按录制时的响应耗时等待
+    """
+    if mode not in ("record", "replay"):
+        raise MailClientError(f"不支持的磁带模式: {mode}")
+    previous = get_transport_factory()
+    if mode == "record":
+        cassette = Cassette(path)
+        set_transport_factory(cassette.recording_transport)
+    else:
+        cassette = Cassette.load(path)
+        # 所有客户端共享同一个回放进度
+        player = cassette.replay_transport(realtime)
+        set_transport_factory(lambda proxy: player)
+    try:
+        yield cassette
+    finally:
+        set_transport_factory(previous)
+        if mode == "record":
+            cassette.save()
+
+
+def benchmark(path: str, scenario: Callable[[], Awaitable[object]], rounds: int = 10,
+              realtime: bool = False) -> dict:
+    """以回放方式重复运行场景，统计每轮耗时
+
+    Args:
+        path: 磁带文件路径
+        scenario: 无参数的异步函数，例如创建邮箱并轮询若干次
+        rounds: 运行轮数
+        realtime: 是否按录制时的响应耗时回放
+
+    Returns:
+        dict: 各轮耗时（秒）的统计
+    """
+    async def run_once() -> None:
+        try:
+            await scenario()
+        finally:
+            await aclose_async_client()
+
+    timings = []
+    for _ in range(rounds):
+        with use_cassette(path, realtime=realtime):
+            started = time.perf_counter()
+            asyncio.run(run_once())
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        "rounds": rounds,
+        "min": timings[0],
+        "median": timings[len(timings) // 2],
+        "max": timings[-1],
+        "total": sum(timings),
+    }
@@ -0,0 +1,288 @@
+import argparse
+import contextlib
+import json
+import sys
+import time
+from dataclasses import asdict
+from typing import Iterable, Optional, TextIO
+
+from temp_mail.client import MailClientABC, MailClientError
+from temp_mail.registry import (IMPORT_BUDGET_MODULES, IMPORT_BUDGET_MS, available_providers, get_client,
+                                measure_import_time)
+
+# asyncio、httpx、出口池、去重等依赖在子命令中才导入，使 `python -m temp_mail --help` 等短命令启动足够快
+
+# 恢复邮箱会话所需的字段
+CREDENTIAL_FIELDS: dict[str, tuple[str, ...]] = {
+    "mail_tm": ("email_password", "email_token", "account_id"),
+    "mail_cx": ("email_token",),
+    "tempmail_lol": ("email_token",),
+    "guerrilla_mail": ("sid_token", "subscriber_cookie"),
+    "idatariver": ("email_id",),
+}
+
+
+def _provider_options(provider: str, args: argparse.Namespace) -> dict:
+    if provider == "idatariver":
+        if not args.key:
+            raise SystemExit("idatariver 需要通过 --key 指定 apikey")
+        return {"key": args.key}
+    if provider == "guerrilla_mail":
+        return {"ip": args.ip}
+    return {}
+
+
+def _credential_fields(provider: str, client: MailClientABC) -> tuple[str, ...]:
+    # 第三方服务商可以通过类属性 credential_fields 声明需要导出的字段
+    return CREDENTIAL_FIELDS.get(provider) or tuple(getattr(client, "credential_fields", ()))
+
+
+def dump_record(provider: str, client: MailClientABC) -> dict:
+    """把邮箱地址和凭据导出为可 JSON 序列化的字典"""
+    return {
+        "provider": provider,
+        "address": client.email_address,
+        "credentials": {name: getattr(client, name) for name in _credential_fields(provider, client)},
+    }
+
+
+def load_record(record: dict, args: argparse.Namespace) -> MailClientABC:
+    """根据 dump_record 导出的字典恢复邮箱客户端"""
+    provider = record["provider"]
+    client = get_client(provider, **_provider_options(provider, args))
+    client.email_address = record["address"]
+    for name, value in record.get("credentials", {}).items():
+        setattr(client, name, value)
+    if provider in ("mail_tm", "mail_cx") and client.email_token:
+        client.headers["Authorization"] = f"Bearer {client.email_token}"
+    return client
+
+
+def _write(out: TextIO, record: dict) -> None:
+    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    out.flush()
+
+
+async def create(args: argparse.Namespace, out: TextIO) -> int:
+    """并发创建邮箱，每创建成功一个立即输出一行 JSON"""
+    import asyncio
+
+    from temp_mail.tools import RateLimiter
+
+    providers = args.provider
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limiter = RateLimiter(args.rate)
+    failures = 0
+
+    async def create_one(index: int) -> None:
+        nonlocal failures
+        provider = providers[index % len(providers)]
+        async with semaphore:
+            await limiter.acquire()
+            client = get_client(provider, **_provider_options(provider, args))
+            try:
+                await client.get_email_address()
+            except Exception as e:
+                failures += 1
+                _write(sys.stderr, {"provider": provider, "error": str(e)})
+                return
+        _write(out, dump_record(provider, client))
+
+    await asyncio.gather(*(create_one(i) for i in range(args.count)))
+    return 1 if failures else 0
+
+
+def _read_records(paths: list[str], addresses: Optional[list[str]]) -> Iterable[dict]:
+    files = [open(p, encoding="utf-8") for p in paths] if paths else [sys.stdin]
+    try:
+        for f in files:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if "address" not in record:
+                    continue
+                if addresses and record["address"] not in addresses:
+                    continue
+                yield record
+    finally:
+        for f in files:
+            if f is not sys.stdin:
+                f.close()
+
+
+async def watch(args: argparse.Namespace, out: TextIO) -> int:
+    """轮询指定邮箱，收到新邮件时立即输出一行 JSON"""
+    import asyncio
+
+    from temp_mail.dedup import get_dedup_index
+    from temp_mail.tools import RateLimiter
+
+    clients = [(r["provider"], load_record(r, args)) for r in _read_records(args.files, args.address)]
+    if not clients:
+        _write(sys.stderr, {"error": "没有可监听的邮箱"})
+        return 1
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limiter = RateLimiter(args.rate)
+    deadline = time.monotonic() + args.duration if args.duration else None
+    dedup = get_dedup_index() if args.dedup else None
+
+    async def poll(provider: str, client: MailClientABC) -> None:
+        async with semaphore:
+            await limiter.acquire()
+            try:
+                emails = await client.get_email_list()
+            except Exception as e:
+                _write(sys.stderr, {"provider": provider, "address": client.email_address, "error": str(e)})
+                return
+        for mail in emails:
+            if dedup is not None and dedup.seen(mail):
+                continue
+            _write(out, {"provider": provider, "address": client.email_address, "mail": asdict(mail)})
+        # 已输出的邮件不再保留，只保留 mail_set 去重
+        emails.clear()
+        client.mail_map.clear()
+
+    while deadline is None or time.monotonic() < deadline:
+        await asyncio.gather(*(poll(p, c) for p, c in clients))
+        await asyncio.sleep(args.interval)
+    return 0
+
+
+async def loadtest(args: argparse.Namespace, out: TextIO) -> int:
+    """运行压测，每个快照输出一行 JSON，最后输出汇总"""
+    from temp_mail.loadtest import LoadTest
+    from temp_mail.simulator import SimulatorProcess
+
+    simulator = SimulatorProcess(
+        args.provider, mail_rate=args.mail_rate, latency=args.latency, error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate, drop_rate=args.drop_rate, etag=not args.no_etag,
+    )
+    test = LoadTest(
+        mailboxes=args.mailboxes, duration=args.duration, poll_interval=args.interval,
+        lifetime=args.lifetime, concurrency=args.concurrency, report_interval=args.report_interval, drain=args.drain, simulator=simulator,
+        accounting=args.accounting,
+    )
+    summary = await test.run(report=lambda snap: _write(out, snap))
+    _write(out, {"summary": summary})
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m temp_mail", description="临时邮箱批量创建与监听工具")
+    parser.add_argument("--key", help="idatariver apikey")
+    parser.add_argument("--ip", default="127.0.0.1", help="guerrilla_mail 使用的用户 IP")
+    parser.add_argument("--proxy", action="append", help="出口代理地址，可重复指定，邮箱会分散到各出口")
+    parser.add_argument("--proxy-rate", type=float, default=None, help="每个出口每秒最多发起的请求数")
+    parser.add_argument("--max-connections", type=int, default=None,
+                        help="每个出口的连接池大小，同时进行的请求数也以此为上限，默认 100")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_create = sub.add_parser("create", help="并发创建邮箱，以 JSONL 输出地址和凭据")
+    p_create.add_argument("-n", "--count", type=int, default=1, help="创建数量")
+    p_create.add_argument("-p", "--provider", action="append", choices=available_providers(),
+                          help="邮箱服务商，可重复指定，按轮转方式分配")
+    p_create.add_argument("-c", "--concurrency", type=int, default=10, help="最大并发数")
+    p_create.add_argument("-r", "--rate", type=float, default=None, help="每秒最多发起的创建请求数")
+
+    p_watch = sub.add_parser("watch", help="监听 create 输出的邮箱，以 JSONL 输出新邮件")
+    p_watch.add_argument("files", nargs="*", help="create 输出的 JSONL 文件，默认读取标准输入")
+    p_watch.add_argument("-a", "--address", action="append", help="只监听指定地址，可重复指定")
+    p_watch.add_argument("-i", "--interval", type=float, default=3.0, help="轮询间隔（秒）")
+    p_watch.add_argument("-d", "--duration", type=float, default=None, help="监听时长（秒），默认一直监听")
+    p_watch.add_argument("-c", "--concurrency", type=int, default=50, help="最大并发数")
+    p_watch.add_argument("-r", "--rate", type=float, default=None, help="每秒最多发起的轮询请求数")
+    p_watch.add_argument("--dedup", action="store_true", help="跨邮箱去重，相同内容的邮件只输出一次")
+
+    p_load = sub.add_parser("loadtest", help="对本地模拟服务进行邮箱生命周期压测，以 JSONL 输出快照")
+    p_load.add_argument("-n", "--mailboxes", type=int, default=1000, help="同时存在的邮箱数量")
+    p_load.add_argument("-d", "--duration", type=float, default=60.0, help="压测时长（秒）")
+    p_load.add_argument("-i", "--interval", type=float, default=3.0, help="轮询间隔（秒）")
+    p_load.add_argument("--lifetime", type=float, default=None, help="邮箱存活时长（秒），到期后销毁并重新创建")
+    p_load.add_argument("-c", "--concurrency", type=int, default=100, help="同时进行的操作数量上限")
+    p_load.add_argument("--report-interval", type=float, default=5.0, help="快照间隔（秒）")
+    p_load.add_argument("--drain", action="store_true", help="每次轮询后清空客户端中的邮件")
+    p_load.add_argument("--accounting", action="store_true", help="按邮箱统计请求数、下载字节数和滞留内存")
+    p_load.add_argument("-p", "--provider", choices=("mail_tm", "tempmail_lol"), default="mail_tm",
+                        help="模拟的服务商")
+    p_load.add_argument("--mail-rate", type=float, default=10.0, help="模拟服务每秒投递的邮件数")
+    p_load.add_argument("--latency", type=float, default=0.0, help="模拟服务的平均响应延迟（秒）")
+    p_load.add_argument("--error-rate", type=float, default=0.0, help="模拟服务返回 500 的比例")
+    p_load.add_argument("--throttle-rate", type=float, default=0.0, help="模拟服务返回 429 的比例")
+    p_load.add_argument("--drop-rate", type=float, default=0.0, help="模拟服务断开连接的比例")
+    p_load.add_argument("--no-etag", action="store_true", help="模拟服务不支持 ETag")
+
+    p_import = sub.add_parser("import-time", help="测量 temp_mail 及命令行入口的导入耗时，超过预算时返回非零状态码")
+    p_import.add_argument("--module", action="append",
+                          help=f"要测量的模块，可重复指定，默认 {', '.join(IMPORT_BUDGET_MODULES)}")
+    p_import.add_argument("--budget", type=float, default=IMPORT_BUDGET_MS, help="耗时预算（毫秒）")
+
+    p_bench = sub.add_parser("bench-convert", help="测量各服务商响应转换为 MailData 的速度")
+    p_bench.add_argument("-p", "--provider", action="append", choices=available_providers(),
+                         help="服务商，可重复指定，默认测量全部")
+    p_bench.add_argument("-n", "--count", type=int, default=10000, help="每个服务商转换的邮件数量")
+    return parser
+
+
+def bench_convert(args: argparse.Namespace, out: TextIO) -> int:
+    """每个服务商输出一行 JSON"""
+    from temp_mail.schema import benchmark
+
+    for result in benchmark(args.provider, args.count):
+        _write(out, result)
+    return 0
+
+
+def import_time(args: argparse.Namespace, out: TextIO) -> int:
+    """每个模块输出一行导入耗时，任一模块超过预算或无法测量时返回 1"""
+    status = 0
+    for module in args.module or IMPORT_BUDGET_MODULES:
+        try:
+            elapsed = measure_import_time(module)
+        except MailClientError as e:
+            _write(out, {"module": module, "error": str(e), "ok": False})
+            status = 1
+            continue
+        ok = elapsed <= args.budget
+        _write(out, {"module": module, "import_ms": elapsed, "budget_ms": args.budget, "ok": ok})
+        if not ok:
+            status = 1
+    return status
+
+
+async def run(args: argparse.Namespace) -> int:
+    from temp_mail.egress import EgressPool
+    from temp_mail.transport import aclose_async_client, set_egress_pool, set_pool_limits
+
+    out = sys.stdout
+    if args.proxy:
+        set_egress_pool(EgressPool(args.proxy, rate=args.proxy_rate))
+    if args.max_connections is not None:
+        set_pool_limits(args.max_connections)
+    # 部分服务商会直接 print 日志，重定向到 stderr 以免破坏 JSONL 输出
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            if args.command == "create":
+                if not args.provider:
+                    args.provider = ["mail_tm"]
+                return await create(args, out)
+            if args.command == "loadtest":
+                return await loadtest(args, out)
+            return await watch(args, out)
+        finally:
+            await aclose_async_client()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "import-time":
+        return import_time(args, sys.stdout)
+    if args.command == "bench-convert":
+        return bench_convert(args, sys.stdout)
+    import asyncio
+
+    try:
+        return asyncio.run(run(args))
+    except KeyboardInterrupt:
+        return 130
@@ -0,0 +1,159 @@
+import hashlib
+import math
+import threading
+from typing import Optional, Union
+
+from temp_mail.client import MailData, MailClientError
+
+
+def fingerprint(mail: MailData) -> bytes:
+    """计算邮件内容指纹
+
+    只使用发件人、主题和正文，同一封广播邮件投递到不同邮箱时指纹相同。
+
+    Args:
+        mail: 邮件数据
+
+    Returns:
+        bytes: 16 字节指纹
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for part in (mail.from_, mail.subject, mail.body, mail.html):
+        h.update((part or "").encode("utf-8", "surrogatepass"))
+        h.update(b"\0")
+    return h.digest()
+
+
+class BloomFilter:
+    """固定大小的布隆过滤器
+
+    Args:
+        capacity: 预期元素数量
+        error_rate: 达到预期元素数量时的误判率
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise MailClientError("布隆过滤器容量必须大于 0，误判率必须在 0 和 1 之间")
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: bytes) -> list[int]:
+        # 双重哈希：由两个 64 位哈希值生成 k 个位置，fingerprint 生成的指纹无需再次哈希
+        digest = key if len(key) == 16 else hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, key: bytes) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key: bytes) -> bool:
+        """添加元素
+
+        Returns:
+            bool: 添加前是否（可能）已存在
+        """
+        bits = self.bits
+        existed = True
+        for p in self._positions(key):
+            mask = 1 << (p & 7)
+            if not bits[p >> 3] & mask:
+                existed = False
+                bits[p >> 3] |= mask
+        if not existed:
+            self.count += 1
+        return existed
+
+
+class DedupIndex:
+    """进程内跨邮箱共享的邮件去重索引
+
+    由若干代布隆过滤器组成，当前代写满后丢弃最老的一代，内存占用固定。
+    索引只记得最近约 ``generations × capacity`` 次写入（至少 ``(generations - 1) × capacity`` 次），
+    更早的邮件会被遗忘，再次出现时判为新邮件；在此窗口内只存在少量误判（把新邮件判为重复，比例约为 error_rate）。
+    线程安全。
+
+    Args:
+        capacity: 每一代的容量
+        error_rate: 每一代的误判率
+        generations: 保留的代数，内存约为 generations * capacity * 1.44 * log2(1 / error_rate) 位
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001, generations: int = 2):
+        if generations <= 0:
+            raise MailClientError("代数必须大于 0")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.generations = generations
+        self._filters = [BloomFilter(capacity, error_rate)]
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.duplicates = 0
+
+    @staticmethod
+    def _key(item: Union[MailData, bytes]) -> bytes:
+        return item if isinstance(item, bytes) else fingerprint(item)
+
+    def __contains__(self, item: Union[MailData, bytes]) -> bool:
+        key = self._key(item)
+        with self._lock:
+            return any(key in f for f in self._filters)
+
+    def seen(self, item: Union[MailData, bytes]) -> bool:
+        """检查并记录邮件
+
+        Args:
+            item: 邮件数据或 fingerprint 计算出的指纹
+
+        Returns:
+            bool: 相同内容的邮件此前是否已出现过
+        """
+        key = self._key(item)
+        with self._lock:
+            self.checked += 1
+            current = self._filters[-1]
+            if any(key in f for f in self._filters[:-1]):
+                duplicate = True
+                # 刷新到当前代，避免热门邮件随旧代一起被遗忘
+                current.add(key)
+            else:
+                duplicate = current.add(key)
+            if current.count >= self.capacity:
+                self._filters.append(BloomFilter(self.capacity, self.error_rate))
+                del self._filters[:-self.generations]
+            if duplicate:
+                self.duplicates += 1
+            return duplicate
+
+    @property
+    def memory_bytes(self) -> int:
+        """最多占用的位图内存（字节）"""
+        return self.generations * len(self._filters[0].bits)
+
+    def stats(self) -> dict:
+        """检查次数、重复次数和内存占用"""
+        with self._lock:
+            return {
+                "checked": self.checked,
+                "duplicates": self.duplicates,
+                "generations": len(self._filters),
+                "memory_bytes": self.memory_bytes,
+            }
+
+
+_default_index: Optional[DedupIndex] = None
+_default_lock = threading.Lock()
+
+
+def get_dedup_index() -> DedupIndex:
+    """获取进程内默认的去重索引"""
+    global _default_index
+    with _default_lock:
+        if _default_index is None:
+            _default_index = DedupIndex()
+        return _default_index
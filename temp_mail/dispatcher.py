@@ -0,0 +1,234 @@
+import asyncio
+import functools
+import inspect
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from temp_mail.client import MailClientABC, MailData, MailClientError
+from temp_mail.monitor import percentile
+
+Handler = Callable[[MailData], Any]
+
+
+class MailDispatcher:
+    """新邮件分发器
+
+    轮询到的新邮件放入有界队列，由工作任务交给所有已注册的处理函数。
+    异步处理函数在工作任务中执行，同步处理函数在线程池中执行，
+    CPU 密集的处理函数可以注册到进程池。队列满时 put 会等待，
+    feed/poll 在队列积压超过高水位时暂停轮询，慢处理函数不会拖垮其他邮箱。
+
+    用法::
+
+        dispatcher = MailDispatcher(maxsize=1000, workers=20)
+        dispatcher.register(save_to_db)
+        dispatcher.register(extract_code, mode="process")
+        async with dispatcher:
+            await asyncio.gather(*(dispatcher.poll(c, interval=3) for c in clients))
+
+    Args:
+        maxsize: 队列容量
+        workers: 工作任务数量
+        high_water: 队列深度达到 maxsize * high_water 时暂停轮询
+        thread_pool: 执行同步处理函数的线程池，None 表示使用事件循环默认线程池
+        process_pool: 执行 mode="process" 处理函数的进程池，None 时按需创建
+        history: 用于统计延迟分位数的最近样本数量
+    """
+
+    def __init__(self, maxsize: int = 1000, workers: int = 10, high_water: float = 0.8,
+                 thread_pool: Optional[Executor] = None, process_pool: Optional[Executor] = None,
+                 history: int = 1024):
+        if maxsize <= 0 or workers <= 0:
+            raise MailClientError("队列容量和工作任务数量必须大于 0")
+        self.maxsize = maxsize
+        self.workers = workers
+        self.high_water = max(1, int(maxsize * high_water))
+        self.thread_pool = thread_pool
+        self.process_pool = process_pool
+        self._own_process_pool = False
+        self._handlers: list[tuple[Handler, str]] = []
+        self._queue: Optional[asyncio.Queue[tuple[MailData, float]]] = None
+        self._tasks: list[asyncio.Task] = []
+        self._ready: Optional[asyncio.Event] = None
+        self._wait_times: deque[float] = deque(maxlen=history)
+        self._latencies: deque[float] = deque(maxlen=history)
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.throttled = 0
+        self.last_error: Optional[str] = None
+
+    def register(self, handler: Handler, mode: str = "auto") -> Handler:
+        """注册处理函数，可作为装饰器使用
+
+        Args:
+            handler: 接收 MailData 的函数
+            mode: "auto" 按函数类型选择，"async" 在事件循环中执行，
+                  "thread" 在线程池中执行，"process" 在进程池中执行（函数和邮件需可 pickle）
+        """
+        if mode == "auto":
+            mode = "async" if inspect.iscoroutinefunction(handler) else "thread"
+        if mode not in ("async", "thread", "process"):
+            raise MailClientError(f"不支持的处理模式: {mode}")
+        if mode == "process" and self._tasks:
+            # 启动后注册的进程处理函数同样需要进程池，否则会落到默认线程池
+            self._ensure_process_pool()
+        self._handlers.append((handler, mode))
+        return handler
+
+    def _ensure_process_pool(self) -> None:
+        if self.process_pool is None:
+            self.process_pool = ProcessPoolExecutor()
+            self._own_process_pool = True
+
+    async def start(self) -> None:
+        """启动工作任务"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(self.maxsize)
+        self._ready = asyncio.Event()
+        self._ready.set()
+        if any(mode == "process" for _, mode in self._handlers):
+            self._ensure_process_pool()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, drain: bool = True) -> None:
+        """停止工作任务
+
+        Args:
+            drain: 是否等待队列中的邮件处理完毕
+        """
+        if not self._tasks:
+            return
+        if drain:
+            await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._own_process_pool:
+            await asyncio.to_thread(self.process_pool.shutdown)
+            self.process_pool = None
+            self._own_process_pool = False
+
+    async def __aenter__(self) -> "MailDispatcher":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.stop(drain=exc_type is None)
+
+    async def put(self, mail: MailData) -> None:
+        """放入一封新邮件，队列满时等待"""
+        if self._queue is None:
+            raise MailClientError("请先调用 start 方法启动分发器")
+        await self._queue.put((mail, time.monotonic()))
+        self.received += 1
+        self._update_ready()
+
+    async def wait_ready(self) -> None:
+        """队列积压超过高水位时等待，直到回落到高水位以下"""
+        if self._ready is None:
+            raise MailClientError("请先调用 start 方法启动分发器")
+        if not self._ready.is_set():
+            self.throttled += 1
+            await self._ready.wait()
+
+    async def feed(self, client: MailClientABC) -> int:
+        """轮询一次邮箱，把新邮件放入队列
+
+        已放入队列的邮件会从 email_list 中移除，只保留 mail_set 用于去重。
+
+        Returns:
+            int: 新邮件数量
+        """
+        await self.wait_ready()
+        emails = await client.get_email_list()
+        count = len(emails)
+        for mail in list(emails):
+            await self.put(mail)
+        emails.clear()
+        client.mail_map.clear()
+        return count
+
+    async def poll(self, client: MailClientABC, interval: float = 3.0,
+                   count: Optional[int] = None) -> None:
+        """持续轮询邮箱并放入队列，处理函数跟不上时自动暂停
+
+        Args:
+            client: 已获取地址的邮箱客户端
+            interval: 轮询间隔（秒）
+            count: 轮询次数，None 表示一直轮询
+        """
+        i = 0
+        while count is None or i < count:
+            i += 1
+            try:
+                await self.feed(client)
+            except Exception as e:
+                # 单个邮箱轮询失败不影响下一次轮询
+                self.last_error = str(e)
+            await asyncio.sleep(interval)
+
+    def _update_ready(self) -> None:
+        depth = self._queue.qsize()
+        if depth >= self.high_water:
+            self._ready.clear()
+        else:
+            self._ready.set()
+
+    async def _run_handler(self, handler: Handler, mode: str, mail: MailData) -> None:
+        if mode == "async":
+            await handler(mail)
+        else:
+            loop = asyncio.get_running_loop()
+            executor = self.process_pool if mode == "process" else self.thread_pool
+            await loop.run_in_executor(executor, functools.partial(handler, mail))
+
+    async def _worker(self) -> None:
+        while True:
+            mail, enqueued = await self._queue.get()
+            self._update_ready()
+            started = time.monotonic()
+            self._wait_times.append(started - enqueued)
+            self.in_flight += 1
+            try:
+                results = await asyncio.gather(
+                    *(self._run_handler(h, mode, mail) for h, mode in self._handlers),
+                    return_exceptions=True,
+                )
+                errors = [r for r in results if isinstance(r, BaseException)]
+                if errors:
+                    self.failed += 1
+                    self.last_error = f"{type(errors[0]).__name__}: {errors[0]}"
+                else:
+                    self.processed += 1
+            finally:
+                self.in_flight -= 1
+                self._latencies.append(time.monotonic() - enqueued)
+                self._queue.task_done()
+
+    def metrics(self) -> dict:
+        """队列深度、处理数量和延迟分位数（毫秒）"""
+        waits = list(self._wait_times)
+        latencies = list(self._latencies)
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "maxsize": self.maxsize,
+            "in_flight": self.in_flight,
+            "received": self.received,
+            "processed": self.processed,
+            "failed": self.failed,
+            "throttled": self.throttled,
+            "paused": self._ready is not None and not self._ready.is_set(),
+            "wait_p50_ms": percentile(waits, 0.5) * 1000,
+            "wait_p95_ms": percentile(waits, 0.95) * 1000,
+            "latency_p50_ms": percentile(latencies, 0.5) * 1000,
+            "latency_p95_ms": percentile(latencies, 0.95) * 1000,
+            "latency_p99_ms": percentile(latencies, 0.99) * 1000,
+            "latency_max_ms": max(latencies, default=0.0) * 1000,
+            "last_error": self.last_error,
+        }
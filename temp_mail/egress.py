@@ -0,0 +1,150 @@
+import asyncio
+import time
+import weakref
+from typing import Iterable, Optional
+
+import httpx
+
+from temp_mail.client import MailClientError
+from temp_mail.tools import RateLimiter
+from temp_mail.transport import new_async_client, schedule_aclose
+
+
+class Egress:
+    """一个出口（直连或代理），拥有独立的连接池和限速预算
+
+    Attributes:
+        name: 出口名称
+        proxy: 代理地址，如 http://127.0.0.1:8080、socks5://127.0.0.1:1080，None 表示直连
+        rate: 每秒允许的请求数，None 表示不限速
+    """
+
+    def __init__(self, name: str, proxy: Optional[str], rate: Optional[float]):
+        self.name = name
+        self.proxy = proxy
+        self.rate = rate
+        self.throttled_until = 0.0
+        self.requests = 0
+        self.throttled = 0
+        self.owners: "weakref.WeakSet[object]" = weakref.WeakSet()
+
+    @property
+    def healthy(self) -> bool:
+        """是否不在限流冷却期内"""
+        return time.monotonic() >= self.throttled_until
+
+    def __repr__(self) -> str:
+        return f"Egress(name={self.name!r}, proxy={self.proxy!r})"
+
+
+class EgressPool:
+    """出口池：邮箱粘性分配到出口，出口被限流时把邮箱迁移到其他健康出口
+
+    服务商按来源 IP 限流，使用多个出口时总吞吐量随出口数量增长。
+    SOCKS 代理需要安装 ``httpx[socks]``。
+
+    用法::
+
+        from temp_mail.transport import set_egress_pool
+
+        set_egress_pool(EgressPool(["http://127.0.0.1:8001", "http://127.0.0.1:8002"], rate=5))
+
+    Args:
+        proxies: 代理地址列表，None 表示直连
+        rate: 每个出口每秒允许的请求数
+        cooldown: 出口被限流后的冷却时间（秒）
+        throttle_status: 视为被限流的 HTTP 状态码
+    """
+
+    def __init__(self, proxies: Iterable[Optional[str]], rate: Optional[float] = None,
+                 cooldown: float = 60.0, throttle_status: tuple[int, ...] = (429,)):
+        self.egresses = [Egress(f"egress-{i}", proxy, rate) for i, proxy in enumerate(proxies)]
+        if not self.egresses:
+            raise MailClientError("出口列表不能为空")
+        self.cooldown = cooldown
+        self.throttle_status = throttle_status
+        self._sticky: "weakref.WeakKeyDictionary[object, Egress]" = weakref.WeakKeyDictionary()
+        # 连接池和限速器不能跨事件循环复用
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]]" = \
+            weakref.WeakKeyDictionary()
+
+    def assign(self, owner: object) -> Egress:
+        """获取邮箱所属的出口
+
+        已分配的邮箱保持在原出口上；原出口处于限流冷却期且有其他健康出口时迁移到负载最低的健康出口。
+
+        Args:
+            owner: 邮箱客户端实例
+        """
+        current = self._sticky.get(owner)
+        if current is not None and current.healthy:
+            return current
+        candidates = [e for e in self.egresses if e.healthy]
+        if not candidates:
+            if current is not None:
+                return current
+            candidates = [min(self.egresses, key=lambda e: e.throttled_until)]
+        target = min(candidates, key=lambda e: len(e.owners))
+        if current is not None:
+            current.owners.discard(owner)
+        target.owners.add(owner)
+        self._sticky[owner] = target
+        return target
+
+    def mark_throttled(self, egress: Egress) -> None:
+        """标记出口被限流，冷却期内其上的邮箱会在下次请求时迁移"""
+        egress.throttled += 1
+        egress.throttled_until = time.monotonic() + self.cooldown
+
+    def client_for(self, owner: object) -> httpx.AsyncClient:
+        """获取邮箱所属出口在当前事件循环中的客户端"""
+        return self._client(self.assign(owner))
+
+    def _client(self, egress: Egress) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        clients = self._clients.setdefault(loop, {})
+        client = clients.get(egress.name)
+        if client is None or client.is_closed:
+            limiter = RateLimiter(egress.rate)
+
+            async def before_request(request: httpx.Request) -> None:
+                await limiter.acquire()
+                egress.requests += 1
+
+            async def after_response(response: httpx.Response) -> None:
+                if response.status_code in self.throttle_status:
+                    self.mark_throttled(egress)
+
+            client = new_async_client(
+                egress.proxy,
+                event_hooks={"request": [before_request], "response": [after_response]},
+            )
+            clients[egress.name] = client
+        return client
+
+    def stats(self) -> list[dict]:
+        """各出口的邮箱数量、请求数和限流状态"""
+        return [
+            {
+                "name": e.name,
+                "proxy": e.proxy,
+                "mailboxes": len(e.owners),
+                "requests": e.requests,
+                "throttled": e.throttled,
+                "healthy": e.healthy,
+            }
+            for e in self.egresses
+        ]
+
+    def invalidate(self) -> None:
+        """关闭所有事件循环中的出口客户端，下次请求时按当前传输层配置重建"""
+        for loop, clients in list(self._clients.items()):
+            schedule_aclose(loop, clients.values())
+        self._clients.clear()
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环中的所有出口客户端"""
+        loop = asyncio.get_running_loop()
+        clients = self._clients.pop(loop, {})
+        for client in clients.values():
+            await client.aclose()
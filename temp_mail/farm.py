@@ -0,0 +1,435 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import threading
+from multiprocessing.connection import Connection, wait
+from typing import AsyncIterator, Optional
+
+from temp_mail.client import MailClientABC, MailData, MailClientError
+from temp_mail.dedup import DedupIndex
+from temp_mail.egress import EgressPool
+from temp_mail.transport import (
+    aclose_async_client, get_egress_pool, get_pool_limits, get_transport_factory, set_egress_pool, set_pool_limits,
+)
+
+# 子进程使用 spawn 启动，避免在持有后台线程（如 SyncMailClient 的事件循环）的进程中 fork
+_mp = multiprocessing.get_context("spawn")
+
+
+def shard_for(address: str, workers: int) -> int:
+    """按邮箱地址计算所属的工作进程编号
+
+    使用最高随机权重（rendezvous）哈希，调整进程数量时只有少量邮箱需要迁移。
+
+    Args:
+        address: 邮箱地址
+        workers: 工作进程数量
+
+    Returns:
+        int: 工作进程编号
+    """
+    if workers <= 0:
+        raise MailClientError("工作进程数量必须大于 0")
+    key = address.lower().encode()
+    best, best_score = 0, b""
+    for index in range(workers):
+        score = hashlib.blake2b(key, digest_size=8, salt=index.to_bytes(8, "little")).digest()
+        if score > best_score:
+            best, best_score = index, score
+    return best
+
+
+class _FarmWorker:
+    """运行在子进程中的轮询器，负责一个分片内的所有邮箱"""
+
+    def __init__(self, conn: Connection, interval: float, concurrency: int):
+        self.conn = conn
+        self.interval = interval
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.clients: dict[str, MailClientABC] = {}
+        self.stop_event = asyncio.Event()
+
+    async def run(self) -> None:
+        reader = asyncio.create_task(self._read())
+        try:
+            while not self.stop_event.is_set():
+                await self._poll_all()
+                try:
+                    await asyncio.wait_for(self.stop_event.wait(), self.interval)
+                except TimeoutError:
+                    pass
+        finally:
+            await reader
+            await aclose_async_client()
+            try:
+                self.conn.send(("stopped",))
+            except (BrokenPipeError, OSError):
+                pass
+
+    async def _read(self) -> None:
+        while True:
+            try:
+                msg = await asyncio.to_thread(self.conn.recv)
+            except (EOFError, OSError):
+                # 主进程已退出
+                self.stop_event.set()
+                return
+            op = msg[0]
+            if op == "add":
+                _, address, client = msg
+                self.clients[address] = client
+            elif op == "remove":
+                _, address, destroy = msg
+                client = self.clients.pop(address, None)
+                if client is not None and destroy:
+                    try:
+                        await client.destroy()
+                    except Exception as e:
+                        self.conn.send(("error", address, f"销毁邮箱地址失败: {str(e)}"))
+            elif op == "stop":
+                self.stop_event.set()
+                return
+
+    async def _poll_one(self, address: str, client: MailClientABC) -> Optional[tuple[str, list[MailData]]]:
+        async with self.semaphore:
+            try:
+                emails = await client.get_email_list()
+            except Exception as e:
+                self.conn.send(("error", address, str(e)))
+                return None
+        if not emails:
+            return None
+        new_mail = list(emails)
+        # 邮件已交给主进程，子进程只保留 mail_set 用于去重
+        client.email_list.clear()
+        client.mail_map.clear()
+        return address, new_mail
+
+    async def _poll_all(self) -> None:
+        if not self.clients:
+            return
+        results = await asyncio.gather(
+            *(self._poll_one(address, client) for address, client in list(self.clients.items()))
+        )
+        batch = [r for r in results if r is not None]
+        if batch:
+            # 一个轮询周期内的新邮件合并为一条消息发送，减少进程间通信次数
+            self.conn.send(("mail", batch))
+
+
+def _worker_config(workers: int) -> dict:
+    # 工作进程以 spawn 启动，不会继承主进程中的模块级传输层设置，需要显式传入
+    if get_transport_factory() is not None:
+        raise MailClientError("邮箱农场的工作进程不能使用自定义传输层（如录制/回放磁带、模拟器），请在单进程中轮询")
+    limits = get_pool_limits()
+    config = {"pool_limits": (limits.max_connections, limits.max_keepalive_connections), "egress": None}
+    pool = get_egress_pool()
+    if pool is not None:
+        # 每个出口的限速预算由所有工作进程平分
+        rates = [None if e.rate is None else e.rate / workers for e in pool.egresses]
+        config["egress"] = ([e.proxy for e in pool.egresses], rates, pool.cooldown, pool.throttle_status)
+    return config
+
+
+def _apply_worker_config(config: dict) -> None:
+    set_pool_limits(*config["pool_limits"])
+    if config["egress"] is not None:
+        proxies, rates, cooldown, throttle_status = config["egress"]
+        pool = EgressPool(proxies, cooldown=cooldown, throttle_status=throttle_status)
+        for egress, rate in zip(pool.egresses, rates):
+            egress.rate = rate
+        set_egress_pool(pool)
+
+
+def _worker_main(conn: Connection, interval: float, concurrency: int, config: dict) -> None:
+    _apply_worker_config(config)
+    asyncio.run(_FarmWorker(conn, interval, concurrency).run())
+
+
+class _WorkerHandle:
+    """主进程中对单个工作进程的引用"""
+
+    def __init__(self, index: int, interval: float, concurrency: int, config: dict):
+        self.index = index
+        parent_conn, child_conn = _mp.Pipe()
+        self.conn = parent_conn
+        self.process = _mp.Process(
+            target=_worker_main,
+            args=(child_conn, interval, concurrency, config),
+            name=f"temp-mail-farm-{index}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.stopped = asyncio.Event()
+        self.send_lock = threading.Lock()
+
+    def send(self, msg: tuple) -> None:
+        with self.send_lock:
+            self.conn.send(msg)
+
+
+class MailboxFarm:
+    """多进程分片邮箱农场
+
+    按邮箱地址哈希把邮箱分配到 N 个工作进程中轮询，新邮件通过管道批量回传到主进程。
+    主进程保存每个邮箱的客户端快照和已收到的邮件 id，
+    因此可以在不丢失邮箱的情况下调整进程数量或重启工作进程。
+
+    工作进程启动时沿用主进程的连接池大小（set_pool_limits）和出口池（set_egress_pool），
+    每个出口的限速预算按进程数平分。自定义传输层（录制/回放磁带、模拟器）无法传给工作进程，
+    设置后启动工作进程会抛出 MailClientError；按邮箱统计（enable_accounting）只统计主进程内的请求，
+    不包含工作进程的轮询。
+
+    用法::
+
+        async with MailboxFarm(workers=4) as farm:
+            client = MailTM()
+            await client.get_email_address()
+            await farm.add_mailbox(client)
+            async for address, mail in farm.mail():
+                print(address, mail.subject)
+    """
+
+    def __init__(self, workers: Optional[int] = None, interval: float = 3.0, concurrency: int = 100,
+                 dedup: Optional[DedupIndex] = None, stop_timeout: float = 35.0):
+        self.workers = workers or os.cpu_count() or 1
+        self.dedup = dedup
+        self.interval = interval
+        self.concurrency = concurrency
+        # 等待工作进程发送完最后一批邮件的最长时间，超时后强制结束进程
+        self.stop_timeout = stop_timeout
+        self.errors: dict[str, str] = {}
+        self._handles: dict[int, _WorkerHandle] = {}
+        self._handles_lock = threading.Lock()
+        self._mailboxes: dict[str, MailClientABC] = {}
+        self._seen: dict[str, set[str]] = {}
+        self._assign: dict[str, int] = {}
+        self._queue: asyncio.Queue[Optional[tuple[str, MailData]]] = asyncio.Queue()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader: Optional[threading.Thread] = None
+        self._running = False
+
+    async def start(self) -> None:
+        """启动工作进程和结果读取线程"""
+        if self._running:
+            return
+        # 在启动任何进程之前检查传输层配置
+        _worker_config(self.workers)
+        self._loop = asyncio.get_running_loop()
+        self._running = True
+        for index in range(self.workers):
+            self._spawn(index)
+        self._reader = threading.Thread(target=self._read_loop, name="temp-mail-farm-reader", daemon=True)
+        self._reader.start()
+
+    async def stop(self, destroy: bool = False) -> None:
+        """停止所有工作进程
+
+        Args:
+            destroy: 是否在停止前销毁所有邮箱
+        """
+        if not self._running:
+            return
+        if destroy:
+            for address in list(self._mailboxes):
+                await self.remove_mailbox(address, destroy=True)
+        for index in list(self._handles):
+            await self._stop_worker(index)
+        self._running = False
+        if self._reader is not None:
+            await asyncio.to_thread(self._reader.join)
+            self._reader = None
+        # 唤醒正在等待新邮件的迭代器
+        self._queue.put_nowait(None)
+
+    async def __aenter__(self) -> "MailboxFarm":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.stop()
+
+    @property
+    def mailboxes(self) -> dict[str, int]:
+        """邮箱地址到工作进程编号的映射"""
+        return dict(self._assign)
+
+    async def add_mailbox(self, client: MailClientABC) -> int:
+        """把已获取地址的邮箱交给农场轮询，之后客户端对象归农场所有
+
+        Args:
+            client: 已调用过 get_email_address 的客户端
+
+        Returns:
+            int: 分配到的工作进程编号
+        """
+        address = getattr(client, "email_address", None)
+        if not isinstance(address, str) or not address:
+            raise MailClientError("请先获取邮箱地址")
+        if not self._running:
+            raise MailClientError("请先调用 start 方法启动邮箱农场")
+        self._mailboxes[address] = client
+        self._seen.setdefault(address, set(client.mail_set))
+        index = shard_for(address, self.workers)
+        self._assign[address] = index
+        self._send_add(index, address)
+        return index
+
+    async def remove_mailbox(self, address: str, destroy: bool = False) -> None:
+        """从农场中移除邮箱
+
+        Args:
+            address: 邮箱地址
+            destroy: 是否同时销毁邮箱
+        """
+        index = self._assign.pop(address, None)
+        self._mailboxes.pop(address, None)
+        self._seen.pop(address, None)
+        self.errors.pop(address, None)
+        if index is not None and index in self._handles:
+            self._handles[index].send(("remove", address, destroy))
+
+    async def resize(self, workers: int) -> None:
+        """调整工作进程数量并重新平衡邮箱
+
+        Args:
+            workers: 新的工作进程数量
+        """
+        if workers <= 0:
+            raise MailClientError("工作进程数量必须大于 0")
+        old = self.workers
+        self.workers = workers
+        for index in range(old, workers):
+            self._spawn(index)
+        for address, index in list(self._assign.items()):
+            target = shard_for(address, workers)
+            if target != index:
+                self._handles[index].send(("remove", address, False))
+                self._assign[address] = target
+                self._send_add(target, address)
+        for index in range(workers, old):
+            await self._stop_worker(index)
+
+    async def restart_worker(self, index: int) -> None:
+        """重启工作进程，并把该分片的邮箱重新分配给新进程
+
+        Args:
+            index: 工作进程编号
+        """
+        if index not in self._handles:
+            raise MailClientError(f"工作进程不存在: {index}")
+        await self._stop_worker(index)
+        self._spawn(index)
+        self._reassign(index)
+
+    async def mail(self) -> AsyncIterator[tuple[str, MailData]]:
+        """异步迭代所有邮箱收到的新邮件
+
+        Yields:
+            tuple[str, MailData]: 邮箱地址和邮件数据
+        """
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            yield item
+
+    def _spawn(self, index: int) -> None:
+        handle = _WorkerHandle(index, self.interval, self.concurrency, _worker_config(self.workers))
+        with self._handles_lock:
+            self._handles[index] = handle
+
+    def _send_add(self, index: int, address: str) -> None:
+        client = self._mailboxes[address]
+        # 只发送去重所需的状态，不发送已收到的邮件内容
+        client.mail_set = set(self._seen[address])
+        client.email_list = []
+        client.mail_map = {}
+        self._handles[index].send(("add", address, client))
+
+    def _reassign(self, index: int) -> None:
+        for address, assigned in self._assign.items():
+            if assigned == index:
+                self._send_add(index, address)
+
+    async def _stop_worker(self, index: int) -> None:
+        handle = self._handles.get(index)
+        if handle is None:
+            return
+        try:
+            handle.send(("stop",))
+        except (BrokenPipeError, OSError):
+            handle.stopped.set()
+        # 等待子进程把最后一批邮件发送完毕，子进程卡住时不能让 stop() 一直挂起
+        try:
+            await asyncio.wait_for(handle.stopped.wait(), self.stop_timeout)
+        except TimeoutError:
+            handle.stopped.set()
+        else:
+            await asyncio.to_thread(handle.process.join, 5.0)
+        if handle.process.is_alive():
+            handle.process.terminate()
+            await asyncio.to_thread(handle.process.join)
+        with self._handles_lock:
+            if self._handles.get(index) is handle:
+                del self._handles[index]
+
+    def _read_loop(self) -> None:
+        while self._running:
+            with self._handles_lock:
+                conns = {h.conn: h for h in self._handles.values() if not h.stopped.is_set()}
+            if not conns:
+                if not self._running:
+                    break
+                threading.Event().wait(0.1)
+                continue
+            try:
+                ready = wait(list(conns), timeout=0.2)
+            except (OSError, ValueError):
+                continue
+            for conn in ready:
+                handle = conns[conn]
+                try:
+                    msg = conn.recv()
+                except (EOFError, OSError):
+                    msg = ("stopped",)
+                    self._loop.call_soon_threadsafe(self._on_worker_exit, handle)
+                self._loop.call_soon_threadsafe(self._dispatch, handle, msg)
+
+    def _dispatch(self, handle: _WorkerHandle, msg: tuple) -> None:
+        op = msg[0]
+        if op == "mail":
+            for address, emails in msg[1]:
+                seen = self._seen.get(address)
+                if seen is None:
+                    # 邮箱已被移除
+                    continue
+                for mail in emails:
+                    # 迁移期间新旧进程可能返回同一封邮件
+                    if mail.id in seen:
+                        continue
+                    seen.add(mail.id)
+                    # 投递到多个邮箱的相同内容只交给调用方一次
+                    if self.dedup is not None and self.dedup.seen(mail):
+                        continue
+                    self._queue.put_nowait((address, mail))
+        elif op == "error":
+            _, address, error = msg
+            if address in self._assign:
+                self.errors[address] = error
+        elif op == "stopped":
+            handle.stopped.set()
+
+    def _on_worker_exit(self, handle: _WorkerHandle) -> None:
+        # 工作进程意外退出时自动重启，邮箱状态由主进程快照恢复
+        if not self._running or handle.stopped.is_set():
+            return
+        handle.stopped.set()
+        with self._handles_lock:
+            if self._handles.get(handle.index) is not handle:
+                return
+        handle.process.join(0)
+        self._spawn(handle.index)
+        self._reassign(handle.index)
@@ -6,13 +6,36 @@ from typing import Optional
 import httpx
 
 from temp_mail.client import MailClientABC, MailData
+from temp_mail.schema import Arg, MailSchema
 from temp_mail.tools import get_sha256_hash
+from temp_mail.transport import http_client, fetch_capped, DEFAULT_MAX_BYTES
 
 
 class GuerrillaMail(MailClientABC):
 
     # doc: https://www.guerrillamail.com/GuerrillaMailAPI.html
 
+    schema = MailSchema(
+        "guerrilla_mail",
+        id=Arg("mail_id"),
+        from_="mail_from",
+        to=Arg("to"),
+        subject="mail_subject",
+        date="mail_timestamp",
+        body="mail_excerpt",
+        html="mail_body",
+        createdAt="mail_date",
+        sample={
+            "mail_id": "1",
+            "mail_from": "noreply@example.com",
+            "mail_subject": "Your verification code is 123456",
+            "mail_excerpt": "Your verification code is 123456",
+            "mail_body": "<p>Your verification code is <b>123456</b></p>",
+            "mail_timestamp": "1738078638",
+            "mail_date": "15:37:18",
+        },
+    )
+
     def __init__(self, ip="127.0.0.1", agent="Python-httpx-client"):
         self.base_url = "https://api.guerrillamail.com/ajax.php"
         self.ip = ip
@@ -23,6 +46,9 @@ class GuerrillaMail(MailClientABC):
         self.email_list: list[MailData] = []
         self.mail_map: dict[str, MailData] = {}
         self.mail_set: set[MailData] = set()
+        # 已收到的最大 mail_id，check_email 只返回比它新的邮件
+        self.seq = 0
+        self.max_message_bytes: Optional[int] = DEFAULT_MAX_BYTES
 
     async def get_email_address(self) -> str:
         fn = f"get_email_address"
@@ -33,7 +59,7 @@ class GuerrillaMail(MailClientABC):
             "lang": "en"  # 语言代码
         }
         try:
-            async with httpx.AsyncClient() as client:
+            async with http_client(self) as client:
                 response = await client.get(
                     self.base_url,
                     params=params,
@@ -60,24 +86,27 @@ class GuerrillaMail(MailClientABC):
         if not self.sid_token or not self.subscriber_cookie:
             raise Exception("请先获取邮箱地址")
         fn = f"check_email"
+        # 响应中带有 ts、stats 等每次都会变化的字段，条件请求和摘要永远不会命中，
+        # 因此不使用 ConditionalPoller，而是用 seq 增量拉取，没有新邮件时列表为空
         params = {
             "f": fn,
-            "seq": 0,
+            "seq": self.seq,
             "sid_token": self.sid_token,
         }
         headers = {
             "cookie": f"PHPSESSID={self.subscriber_cookie}"
         }
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
+            async with http_client(self) as client:
+                list_content = await fetch_capped(
+                    client,
                     self.base_url,
+                    self.max_message_bytes,
                     params=params,
                     timeout=30.0,
                     headers=headers
                 )
-                response.raise_for_status()
-                ll = response.json()["list"]
+                ll = json.loads(list_content)["list"]
                 if len(ll) > 0:
                     for email in ll:
                         mail_id = email["mail_id"]
@@ -88,30 +117,21 @@ class GuerrillaMail(MailClientABC):
                                 "email_id": mail_id,
                                 "sid_token": self.sid_token,
                             }
-                            response = await client.get(
+                            content = await fetch_capped(
+                                client,
                                 self.base_url,
+                                self.max_message_bytes,
                                 params=params,
                                 timeout=30.0,
                                 headers=headers
                             )
-                            response.raise_for_status()
-                            email_data = response.json()
+                            email_data = json.loads(content)
                             md5_hash = get_sha256_hash(json.dumps(email_data))
-                            item = MailData(
-                                md5=md5_hash,
-                                id=mail_id,
-                                from_=email_data["mail_from"],
-                                to=self.email_address,
-                                subject=email_data["mail_subject"],
-                                date=email_data["mail_timestamp"],
-                                body=email_data["mail_excerpt"],
-                                html=email_data["mail_body"],
-                                createdAt=email_data["mail_date"]
-                            )
+                            item = self.schema.convert(email_data,md5_hash,mail_id=mail_id,to=self.email_address)
                             self.email_list.append(item)
                             self.mail_map[item.id] = item
-                        else:
-                            pass
+                        # 已见过的邮件也推进 seq：从农场快照恢复时 mail_set 已恢复而 seq 可能落后
+                        self.seq = max(self.seq, int(mail_id))
 
         except httpx.HTTPStatusError as e:
             raise Exception(f"获取邮箱收件列表失败，HTTP状态码: {e.response.status_code}, 详情: {e.response.text}") from e
@@ -133,7 +153,7 @@ class GuerrillaMail(MailClientABC):
             "cookie": f"PHPSESSID={self.subscriber_cookie}"
         }
         try:
-            async with httpx.AsyncClient() as client:
+            async with http_client(self) as client:
                 response = await client.get(
                     self.base_url,
                     params=params,
@@ -3,19 +3,40 @@ import json
 import random
 import re
 import time
-from datetime import datetime
 from typing import Optional
 
 import httpx
 
 from temp_mail.client import MailClientABC, MailData, MailClientError
+from temp_mail.schema import Arg, Field, MailSchema, parse_unix_timestamp
 from temp_mail.tools import generate_secure_random_string, get_sha256_hash, destroy_mail
+from temp_mail.transport import http_client, ConditionalPoller, fetch_capped, DEFAULT_MAX_BYTES
 
 
 
 class IDataRiverClient(MailClientABC):
     # doc: https://www.idatariver.com/zh-cn/project/%E4%B8%B4%E6%97%B6%E9%82%AE%E7%AE%B1api-cbea
 
+    schema = MailSchema(
+        "idatariver",
+        id=Arg("mail_id"),
+        from_="result.from",
+        to=Arg("to"),
+        subject="result.subject",
+        body="result.content",
+        html="result.content",
+        timestamp=Field("result.time", parse_unix_timestamp),  # 1738078638
+        sample={
+            "code": 0,
+            "result": {
+                "time": 1738078638,
+                "from": "noreply@example.com",
+                "subject": "Your verification code is 123456",
+                "content": "<p>Your verification code is <b>123456</b></p>",
+            },
+        },
+    )
+
     def __init__(self,key:str):
         self.key = key
         self.api_url = "https://apiok.us"
@@ -28,6 +49,8 @@ class IDataRiverClient(MailClientABC):
         self.email_list: list[MailData] = []
         self.mail_map: dict[str, MailData] = {}
         self.mail_set: set[MailData] = set()
+        self.poller = ConditionalPoller()
+        self.max_message_bytes: Optional[int] = DEFAULT_MAX_BYTES
 
 
     async def get_email_address(self) -> str:
@@ -37,7 +60,7 @@ class IDataRiverClient(MailClientABC):
             "type": "*",
         }
         try:
-            async with httpx.AsyncClient() as client:
+            async with http_client(self) as client:
                 response = await client.get(url, params=params)
                 response.raise_for_status()
                 data = response.json()
@@ -57,19 +80,22 @@ class IDataRiverClient(MailClientABC):
             raise MailClientError("请先获取邮箱地址")
         url = f"{self.api_url}/api/cbea/messages/v1"
         try:
-            async with httpx.AsyncClient() as client:
+            async with http_client(self) as client:
                 params = {
                     "apikey": self.key,
                     "id": self.email_id,
                 }
-                response = await client.get(
+                list_response = await self.poller.get(
+                    client,
                     url,
                     headers=self.headers,
                     timeout=30.0,
                     params=params,
                 )
-                response.raise_for_status()
-                mail_list = response.json()["result"]["messages"]
+                if list_response is None:
+                    # 收件列表没有变化
+                    return self.email_list
+                mail_list = list_response.json()["result"]["messages"]
                 if len(mail_list)>0:
                     for mail_x in mail_list:
                         if mail_x["id"] not in self.mail_set:
@@ -81,19 +107,21 @@ class IDataRiverClient(MailClientABC):
                                 "apikey": self.key,
                                 "id": mail_id,
                             }
-                            response = await client.get(
+                            content = await fetch_capped(
+                                client,
                                 url,
+                                self.max_message_bytes,
                                 headers=self.headers,
                                 timeout=30.0,
                                 params=params,
                             )
-                            response.raise_for_status()
-                            mail_data = response.json()
+                            mail_data = json.loads(content)
                             md5_hash = get_sha256_hash(json.dumps(mail_data))
                             item = self.convert_data(mail_data,md5_hash,mail_id)
                             self.email_list.append(item)
                         else:
                             pass
+                self.poller.commit(list_response)
         except httpx.HTTPStatusError as e:
             raise MailClientError(
                 f"获取邮箱收件列表失败，HTTP状态码: {e.response.status_code}, 详情: {e.response.text}") from e
@@ -108,22 +136,7 @@ class IDataRiverClient(MailClientABC):
 
 
     def convert_data(self,mail_data:dict,md5_hash:str,id:str)->MailData:
-        timestamp = mail_data["result"]["time"]  # 1738078638
-        t = datetime.fromtimestamp(timestamp)
-        created_at = t.strftime("%Y-%m-%d %H:%M:%S")
-        # 将邮件数据存入字典中
-        item = MailData(
-            md5=md5_hash,
-            id=id,
-            from_=mail_data["result"]["from"],
-            to=self.email_address,
-            subject=mail_data["result"]["subject"],
-            date=timestamp,
-            body=mail_data["result"]["content"],
-            html=mail_data["result"]["content"],
-            createdAt=created_at
-        )
-        return item
+        return self.schema.convert(mail_data,md5_hash,mail_id=id,to=self.email_address)
 
 async def main():
     mail_client = IDataRiverClient(key="your_key")
@@ -0,0 +1,202 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from typing import Callable, Optional, Union
+
+from temp_mail.client import MailClientABC
+from temp_mail.monitor import LoopLagMonitor, enable_accounting, percentile
+from temp_mail.simulator import SimulatedMailTM, SimulatedTempMailLOL, SimulatorProcess
+
+_OPS = ("create", "poll", "destroy")
+
+
+def open_fds() -> Optional[int]:
+    """当前进程打开的文件描述符数量，不支持的平台返回 None"""
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def rss_bytes() -> Optional[int]:
+    """当前进程的常驻内存（字节），不支持的平台返回峰值常驻内存"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return None
+
+
+class LoadTest:
+    """邮箱生命周期压测 / 浸泡测试
+
+    同时维持 ``mailboxes`` 个邮箱，每个邮箱循环执行 创建 → 轮询 → 销毁，
+    每隔 ``report_interval`` 秒输出一次吞吐量、延迟分位数、事件循环延迟、
+    文件描述符、连接数、内存和客户端滞留邮件数的快照，用于发现泄漏。
+
+    默认对在独立进程中运行的 SimulatedMailTM（SimulatorProcess）压测，快照中的事件循环延迟、
+    文件描述符和内存不包含服务端。SimulatorProcess(provider="tempmail_lol") 或 SimulatedTempMailLOL
+    模拟收件列表包含完整邮件的服务；也可以通过 client_factory 压测其他实现。
+
+    Args:
+        mailboxes: 同时存在的邮箱数量
+        duration: 压测时长（秒）
+        poll_interval: 每个邮箱的轮询间隔（秒）
+        lifetime: 邮箱存活时长（秒），到期后销毁并创建新邮箱；None 表示一直存活到结束
+        create_concurrency: 同时创建邮箱的最大数量
+        concurrency: 同时进行的操作数量上限；http_client() 已按连接池大小限制同时进行的请求，
+            这里额外限制压测自身的并发，使延迟统计不包含排队时间
+        report_interval: 快照间隔（秒）
+        drain: 每次轮询后是否清空 email_list/mail_map，False 时可观察客户端内存增长
+        simulator: 模拟服务，None 时使用默认参数创建 SimulatorProcess；
+            传入 SimulatedMailTM / SimulatedTempMailLOL 时服务端与客户端共用事件循环和进程
+        client_factory: 根据服务地址创建客户端的函数，默认创建模拟服务对应服务商的客户端，
+            并把 api_url 指向模拟服务
+        accounting: 是否开启按邮箱统计，开启后快照中包含资源使用最多的邮箱
+    """
+
+    def __init__(self, mailboxes: int = 1000, duration: float = 60.0, poll_interval: float = 3.0,
+                 lifetime: Optional[float] = None, create_concurrency: int = 50, concurrency: int = 100,
+                 report_interval: float = 5.0, drain: bool = False,
+                 simulator: Union[SimulatedMailTM, SimulatedTempMailLOL, SimulatorProcess, None] = None,
+                 client_factory: Optional[Callable[[str], MailClientABC]] = None, accounting: bool = False):
+        self.mailboxes = mailboxes
+        self.duration = duration
+        self.poll_interval = poll_interval
+        self.lifetime = lifetime
+        self.report_interval = report_interval
+        self.drain = drain
+        self.simulator = simulator or SimulatorProcess()
+        self.client_factory = client_factory or self._default_factory
+        self._create_semaphore = asyncio.Semaphore(create_concurrency)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._latencies = {op: deque(maxlen=10000) for op in _OPS}
+        self.counts = {op: 0 for op in _OPS}
+        self.errors = {op: 0 for op in _OPS}
+        self.received = 0
+        self.active = 0
+        self._clients: set[MailClientABC] = set()
+        self._stopping = False
+        self.lag = LoopLagMonitor(detect_blocking=True)
+        self.accounting = enable_accounting() if accounting else None
+
+    def _default_factory(self, url: str) -> MailClientABC:
+        from temp_mail.registry import get_provider_class
+        client = get_provider_class(self.simulator.provider)()
+        client.api_url = url
+        return client
+
+    async def _timed(self, op: str, coro) -> bool:
+        async with self._semaphore:
+            started = time.monotonic()
+            try:
+                await coro
+            except Exception:
+                self.errors[op] += 1
+                return False
+            finally:
+                self._latencies[op].append(time.monotonic() - started)
+        self.counts[op] += 1
+        return True
+
+    async def _mailbox(self) -> None:
+        await asyncio.sleep(random.uniform(0, self.poll_interval))
+        while not self._stopping:
+            client = self.client_factory(self.simulator.url)
+            async with self._create_semaphore:
+                ok = await self._timed("create", client.get_email_address())
+            if not ok:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            self.active += 1
+            self._clients.add(client)
+            born = time.monotonic()
+            seen = 0
+            try:
+                while not self._stopping and (self.lifetime is None or time.monotonic() - born < self.lifetime):
+                    await asyncio.sleep(self.poll_interval * random.uniform(0.9, 1.1))
+                    if await self._timed("poll", client.get_email_list()):
+                        self.received += len(client.email_list) - seen
+                        seen = len(client.email_list)
+                        if self.drain:
+                            client.email_list.clear()
+                            client.mail_map.clear()
+                            seen = 0
+                await self._timed("destroy", client.destroy())
+            finally:
+                self.active -= 1
+                self._clients.discard(client)
+
+    def snapshot(self, elapsed: float, interval: float, previous: dict) -> dict:
+        """生成一次快照，previous 为上一次快照，用于计算区间吞吐量"""
+        snap = {
+            "elapsed": round(elapsed, 3),
+            "active_mailboxes": self.active,
+            "received": self.received,
+            "received_per_s": (self.received - previous.get("received", 0)) / interval if interval else 0.0,
+        }
+        for op in _OPS:
+            latencies = list(self._latencies[op])
+            snap[f"{op}_count"] = self.counts[op]
+            snap[f"{op}_errors"] = self.errors[op]
+            snap[f"{op}_per_s"] = (self.counts[op] - previous.get(f"{op}_count", 0)) / interval if interval else 0.0
+            snap[f"{op}_p50_ms"] = percentile(latencies, 0.5) * 1000
+            snap[f"{op}_p95_ms"] = percentile(latencies, 0.95) * 1000
+            snap[f"{op}_p99_ms"] = percentile(latencies, 0.99) * 1000
+        snap.update(self.lag.stats())
+        snap["open_fds"] = open_fds()
+        snap["rss_bytes"] = rss_bytes()
+        # 客户端中滞留的邮件数，持续增长说明存在泄漏
+        snap["retained_mails"] = sum(len(c.email_list) for c in self._clients)
+        snap["retained_ids"] = sum(len(c.mail_set) for c in self._clients)
+        if self.accounting is not None:
+            for key in ("bytes_retained", "bytes_downloaded", "requests"):
+                top = self.accounting.top(1, by=key)
+                snap[f"top_mailbox_{key}"] = top[0][1][key] if top else 0
+        snap.update(self.simulator.stats())
+        return snap
+
+    async def run(self, report: Optional[Callable[[dict], None]] = None) -> dict:
+        """运行压测
+
+        Args:
+            report: 每次快照时调用的函数
+
+        Returns:
+            dict: 结束时的快照，附带整个过程中的内存增长和阻塞事件循环的调用位置
+        """
+        from temp_mail.transport import aclose_async_client
+
+        await self.simulator.start()
+        self.lag.start()
+        started = time.monotonic()
+        rss_start = rss_bytes()
+        tasks = [asyncio.create_task(self._mailbox()) for _ in range(self.mailboxes)]
+        previous: dict = {}
+        last = started
+        try:
+            while time.monotonic() - started < self.duration:
+                await asyncio.sleep(min(self.report_interval, max(0.0, self.duration - (time.monotonic() - started))))
+                now = time.monotonic()
+                previous = self.snapshot(now - started, now - last, previous)
+                last = now
+                if report is not None:
+                    report(previous)
+        finally:
+            self._stopping = True
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.lag.stop()
+            await aclose_async_client()
+            await self.simulator.stop()
+        rss_end = rss_bytes()
+        if rss_start is not None and rss_end is not None:
+            previous["rss_growth_bytes"] = rss_end - rss_start
+        previous["blocking_call_sites"] = self.lag.blocking_calls()
+        return previous
@@ -1,19 +1,40 @@
 import asyncio
 import json
 import random
-import re
 import time
-from datetime import datetime
 from typing import Optional
 
 import httpx
 
 from temp_mail.client import MailClientABC, MailData, MailClientError
+from temp_mail.schema import Field, MailSchema, extract_address, parse_nano_timestamp
 from temp_mail.tools import generate_secure_random_string, get_sha256_hash, destroy_mail
+from temp_mail.transport import http_client, ConditionalPoller, fetch_capped, stream_to, DEFAULT_MAX_BYTES, Sink
 
 DOMAINS = ["yzm.de","qabq.com","nqmo.com","end.tw","uuf.me","yzm.de"]
 
 class MailCX(MailClientABC):
+    schema = MailSchema(
+        "mail_cx",
+        id="id",
+        from_=Field("from", extract_address),
+        to=Field("to.0", extract_address),
+        subject="subject",
+        body="body.text",
+        html="body.html",
+        timestamp=Field("date", parse_nano_timestamp),  # "2025-01-27T07:27:25.711873584Z"
+        sample={
+            "id": "01JJMWZ3QK8Y1V2N4X5B6C7D8E",
+            "date": "2025-01-27T07:27:25.711873584Z",
+            "from": "Example <noreply@example.com>",
+            "to": ["<user@example.com>"],
+            "subject": "Your verification code is 123456",
+            "body": {
+                "text": "Your verification code is 123456",
+                "html": "<p>Your verification code is <b>123456</b></p>",
+            },
+        },
+    )
 
     def __init__(self):
         self.domains:list[str] = DOMAINS
@@ -27,13 +48,15 @@ class MailCX(MailClientABC):
         self.email_list: list[MailData] = []
         self.mail_map: dict[str, MailData] = {}
         self.mail_set: set[MailData] = set()
+        self.poller = ConditionalPoller()
+        self.max_message_bytes: Optional[int] = DEFAULT_MAX_BYTES
 
     # doc:https://api.mail.cx/
 
     async def auth(self)->None:
         url = f"{self.api_url}/api/v1/auth/authorize_token"
         try:
-            async with httpx.AsyncClient() as client:
+            async with http_client(self) as client:
                 response = await client.post(
                     url,
                     headers=self.headers,
@@ -67,14 +90,17 @@ class MailCX(MailClientABC):
             raise MailClientError("请先获取邮箱地址")
         url = f"{self.api_url}/api/v1/mailbox/{self.email_address}"
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
+            async with http_client(self) as client:
+                list_response = await self.poller.get(
+                    client,
                     url,
                     headers=self.headers,
                     timeout=30.0
                 )
-                response.raise_for_status()
-                mail_list = response.json()
+                if list_response is None:
+                    # 收件列表没有变化
+                    return self.email_list
+                mail_list = list_response.json()
                 if len(mail_list)>0:
                     for mail_x in mail_list:
                         if mail_x["id"] not in self.mail_set:
@@ -82,18 +108,20 @@ class MailCX(MailClientABC):
                             self.mail_set.add(mail_id)
                             # 获取邮件细节
                             url = f"{self.api_url}/api/v1/mailbox/{self.email_address}/{mail_id}"
-                            response = await client.get(
+                            content = await fetch_capped(
+                                client,
                                 url,
+                                self.max_message_bytes,
                                 headers=self.headers,
                                 timeout=30.0
                             )
-                            response.raise_for_status()
-                            mail_data = response.json()
+                            mail_data = json.loads(content)
                             md5_hash = get_sha256_hash(json.dumps(mail_data))
                             item = MailCX.convert_data(mail_data,md5_hash)
                             self.email_list.append(item)
                         else:
                             pass
+                self.poller.commit(list_response)
         except httpx.HTTPStatusError as e:
             raise MailClientError(
                 f"获取邮箱收件列表失败，HTTP状态码: {e.response.status_code}, 详情: {e.response.text}") from e
@@ -105,7 +133,7 @@ class MailCX(MailClientABC):
 
     async def destroy(self) -> None:
         url = f"{self.api_url}/api/v1/mailbox/{self.email_address}"
-        await destroy_mail(self.email_address,url,self.headers)
+        await destroy_mail(self.email_address,url,self.headers,self)
         # try:
         #     async with httpx.AsyncClient() as client:
         #         response = await client.delete(
@@ -122,33 +150,36 @@ class MailCX(MailClientABC):
         # except Exception as e:
         #     raise MailClientError(f"销毁邮箱地址发生未知错误: {str(e)}") from e
 
+    async def download_source(self, mail_id: str, sink: Sink, max_bytes: Optional[int] = None) -> int:
+        """按块下载邮件原始 MIME 源码到文件或调用方提供的目标
+
+        Args:
+            mail_id: 邮件 id
+            sink: 文件路径、带 write 方法的对象，或接收数据块的函数
+            max_bytes: 大小上限，None 表示不限制
+
+        Returns:
+            int: 写入的字节数
+        """
+        if not self.email_address:
+            raise MailClientError("请先获取邮箱地址")
+        url = f"{self.api_url}/api/v1/mailbox/{self.email_address}/{mail_id}/source"
+        try:
+            async with http_client(self) as client:
+                return await stream_to(client, url, sink, max_bytes, headers=self.headers, timeout=30.0)
+        except httpx.HTTPStatusError as e:
+            raise MailClientError(
+                f"下载邮件源码失败，HTTP状态码: {e.response.status_code}, 详情: {e.response.text}") from e
+        except httpx.RequestError as e:
+            raise MailClientError(f"下载邮件源码请求失败: {str(e)}") from e
+        except MailClientError:
+            raise
+        except Exception as e:
+            raise MailClientError(f"下载邮件源码发生未知错误: {str(e)}") from e
+
     @staticmethod
     def convert_data(mail_data:dict,md5_hash:str)->MailData:
-        t = mail_data["date"]  # "2025-01-27T07:27:25.711873584Z"
-        tt = datetime.strptime(t[:26], "%Y-%m-%dT%H:%M:%S.%f")
-        created_at = tt.strftime("%Y-%m-%d %H:%M:%S")
-        date = int(tt.timestamp() * 1000)
-        from_ = mail_data["from"]
-        to = mail_data["to"][0]
-        # 正则表达式用于匹配电子邮件地址
-        email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        from_email = re.search(email_pattern, from_)
-        to_email = re.search(email_pattern, to)
-        from_email_address = from_email.group() if from_email else None
-        to_email_address = to_email.group() if to_email else None
-        # 将邮件数据存入字典中
-        item = MailData(
-            md5=md5_hash,
-            id=mail_data["id"],
-            from_=from_email_address,
-            to=to_email_address,
-            subject=mail_data["subject"],
-            date=date,
-            body=mail_data["body"]["text"],
-            html=mail_data["body"]["html"],
-            createdAt=created_at
-        )
-        return item
+        return MailCX.schema.convert(mail_data,md5_hash)
 
 async def main():
     mail_client = MailCX()
@@ -3,16 +3,36 @@ import json
 import random
 import re
 import time
-from datetime import datetime
 from typing import Optional
 
 import httpx
 
 from temp_mail.client import MailClientABC, MailData, MailClientError
+from temp_mail.schema import Field, MailSchema, parse_iso_timestamp
 from temp_mail.tools import generate_secure_random_string, get_sha256_hash, destroy_mail
+from temp_mail.transport import http_client, ConditionalPoller, fetch_capped, stream_to, DEFAULT_MAX_BYTES, Sink
 
 
 class MailTM(MailClientABC):
+    schema = MailSchema(
+        "mail_tm",
+        id="id",
+        from_="from.address",
+        to="to.0.address",
+        subject="subject",
+        body="text",
+        html="html.0",
+        timestamp=Field("createdAt", parse_iso_timestamp),  # "2025-01-27T09:54:45+00:00"
+        sample={
+            "id": "679759a5c5d7b5e1b2f0a1c3",
+            "createdAt": "2025-01-27T09:54:45+00:00",
+            "from": {"address": "noreply@example.com", "name": "Example"},
+            "to": [{"address": "user@example.com", "name": ""}],
+            "subject": "Your verification code is 123456",
+            "text": "Your verification code is 123456",
+            "html": ["<p>Your verification code is <b>123456</b></p>"],
+        },
+    )
 
     def __init__(self):
         self.domains:list[str] = []
@@ -28,13 +48,15 @@ class MailTM(MailClientABC):
         self.account_id: Optional[str] = None
         self.mail_map: dict[str, MailData] = {}
         self.mail_set: set[MailData] = set()
+        self.poller = ConditionalPoller()
+        self.max_message_bytes: Optional[int] = DEFAULT_MAX_BYTES
 
     # doc: https://docs.mail.tm/
 
     async def get_domains(self)->list[str]:
         url = f"{self.api_url}/domains"
         try:
-            async with httpx.AsyncClient() as client:
+            async with http_client(self) as client:
                 response = await client.get(
                     url,
                     headers=self.headers,
@@ -68,7 +90,7 @@ class MailTM(MailClientABC):
         self.email_password = generate_secure_random_string(16)
         url = f"{self.api_url}/accounts"
         try:
-            async with httpx.AsyncClient() as client:
+            async with http_client(self) as client:
                 response = await client.post(
                     url,
                     headers=self.headers,
@@ -93,7 +115,7 @@ class MailTM(MailClientABC):
             raise MailClientError("邮箱地址或密码为空，请先调用 create_email_address 方法设置邮箱地址和密码")
         url = f"{self.api_url}/token"
         try:
-            async with httpx.AsyncClient() as client:
+            async with http_client(self) as client:
                 response = await client.post(
                     url,
                     headers=self.headers,
@@ -124,7 +146,7 @@ class MailTM(MailClientABC):
 
     async def destroy(self) -> None:
         url = f"{self.api_url}/accounts/{self.account_id}"
-        await destroy_mail(self.email_address,url,self.headers)
+        await destroy_mail(self.email_address,url,self.headers,self)
         # try:
         #     async with httpx.AsyncClient() as client:
         #         response = await client.delete(
@@ -146,14 +168,17 @@ class MailTM(MailClientABC):
             raise MailClientError("请先获取邮箱地址")
         url = f"{self.api_url}/messages"
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
+            async with http_client(self) as client:
+                list_response = await self.poller.get(
+                    client,
                     url,
                     headers=self.headers,
                     timeout=30.0
                 )
-                response.raise_for_status()
-                mail_list = response.json()["hydra:member"]
+                if list_response is None:
+                    # 收件列表没有变化
+                    return self.email_list
+                mail_list = list_response.json()["hydra:member"]
                 if len(mail_list)>0:
                     for mail_x in mail_list:
                         if mail_x["id"] not in self.mail_set:
@@ -161,18 +186,20 @@ class MailTM(MailClientABC):
                             self.mail_set.add(mail_id)
                             # 获取邮件细节
                             url = f"{self.api_url}/messages/{mail_id}"
-                            response = await client.get(
+                            content = await fetch_capped(
+                                client,
                                 url,
+                                self.max_message_bytes,
                                 headers=self.headers,
                                 timeout=30.0
                             )
-                            response.raise_for_status()
-                            mail_data = response.json()
+                            mail_data = json.loads(content)
                             md5_hash = get_sha256_hash(json.dumps(mail_data))
                             item = MailTM.convert_data(mail_data,md5_hash)
                             self.email_list.append(item)
                         else:
                             pass
+                self.poller.commit(list_response)
         except httpx.HTTPStatusError as e:
             raise MailClientError(
                 f"获取邮箱收件列表失败，HTTP状态码: {e.response.status_code}, 详情: {e.response.text}") from e
@@ -182,29 +209,56 @@ class MailTM(MailClientABC):
             raise MailClientError(f"获取邮箱收件列表发生未知错误: {str(e)}") from e
         return self.email_list
 
+    async def download_source(self, mail_id: str, sink: Sink, max_bytes: Optional[int] = None) -> int:
+        """按块下载邮件原始 MIME 源码到文件或调用方提供的目标
+
+        Args:
+            mail_id: 邮件 id
+            sink: 文件路径、带 write 方法的对象，或接收数据块的函数
+            max_bytes: 大小上限，None 表示不限制
+
+        Returns:
+            int: 写入的字节数
+        """
+        url = f"{self.api_url}/messages/{mail_id}/download"
+        return await self._download(url, sink, max_bytes, "下载邮件源码")
+
+    async def download_attachment(self, mail_id: str, attachment_id: str, sink: Sink,
+                                  max_bytes: Optional[int] = None) -> int:
+        """按块下载邮件附件到文件或调用方提供的目标
+
+        Args:
+            mail_id: 邮件 id
+            attachment_id: 附件 id
+            sink: 文件路径、带 write 方法的对象，或接收数据块的函数
+            max_bytes: 大小上限，None 表示不限制
+
+        Returns:
+            int: 写入的字节数
+        """
+        url = f"{self.api_url}/messages/{mail_id}/attachment/{attachment_id}"
+        return await self._download(url, sink, max_bytes, "下载邮件附件")
+
+    async def _download(self, url: str, sink: Sink, max_bytes: Optional[int], action: str) -> int:
+        if self.email_token is None:
+            raise MailClientError("请先获取邮箱地址")
+        headers = {k: v for k, v in self.headers.items() if k != "Content-Type"}
+        try:
+            async with http_client(self) as client:
+                return await stream_to(client, url, sink, max_bytes, headers=headers, timeout=30.0)
+        except httpx.HTTPStatusError as e:
+            raise MailClientError(
+                f"{action}失败，HTTP状态码: {e.response.status_code}, 详情: {e.response.text}") from e
+        except httpx.RequestError as e:
+            raise MailClientError(f"{action}请求失败: {str(e)}") from e
+        except MailClientError:
+            raise
+        except Exception as e:
+            raise MailClientError(f"{action}发生未知错误: {str(e)}") from e
+
     @staticmethod
     def convert_data(mail_data:dict,md5_hash:str)->MailData:
-        t = mail_data["createdAt"]  # "2025-01-27T09:54:45+00:00"
-        tt = datetime.fromisoformat(t)
-        created_at = tt.strftime("%Y-%m-%d %H:%M:%S")
-        date = int(tt.timestamp() * 1000)
-        from_ = mail_data["from"]["address"]
-        to = mail_data["to"][0]["address"]
-        from_email_address = from_
-        to_email_address = to
-        # 将邮件数据存入字典中
-        item = MailData(
-            md5=md5_hash,
-            id=mail_data["id"],
-            from_=from_email_address,
-            to=to_email_address,
-            subject=mail_data["subject"],
-            date=date,
-            body=mail_data["text"],
-            html=mail_data["html"][0],
-            createdAt=created_at
-        )
-        return item
+        return MailTM.schema.convert(mail_data,md5_hash)
 
 async def main():
     mail_client = MailTM()
@@ -0,0 +1,247 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from typing import Optional
+
+from temp_mail.transport import set_usage_recorder
+
+
+def percentile(values: list[float], q: float) -> float:
+    """计算分位数，values 为空时返回 0"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class LoopLagMonitor:
+    """事件循环延迟采样器
+
+    定期 sleep 固定间隔，实际唤醒时间与预期的差值即为事件循环被阻塞的时间。
+    开启 detect_blocking 后，后台看门狗线程在事件循环被阻塞超过阈值时抓取事件循环线程的调用栈，
+    按阻塞位置（如 ``time.sleep`` 的调用处）汇总。
+
+    Args:
+        interval: 采样间隔（秒）
+        history: 保留的最近样本数量
+        detect_blocking: 是否记录阻塞调用的位置
+        block_threshold: 视为阻塞调用的时长（秒）
+    """
+
+    def __init__(self, interval: float = 0.1, history: int = 1024, detect_blocking: bool = False,
+                 block_threshold: float = 0.1):
+        self.interval = interval
+        self.samples: deque[float] = deque(maxlen=history)
+        self.max_lag = 0.0
+        self.detect_blocking = detect_blocking
+        self.block_threshold = block_threshold
+        self._task: Optional[asyncio.Task] = None
+        self._heartbeat = 0.0
+        self._loop_thread: Optional[int] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._watchdog_stop = threading.Event()
+        self._blocking: dict[str, dict] = {}
+        self._blocking_lock = threading.Lock()
+
+    async def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            self._heartbeat = started
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - started - self.interval)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def _watch(self) -> None:
+        reported = None
+        while not self._watchdog_stop.wait(self.interval / 2):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked < self.block_threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            if not stack:
+                continue
+            top = stack[-1]
+            location = f"{top.filename}:{top.lineno} in {top.name}"
+            with self._blocking_lock:
+                event = self._blocking.get(location)
+                if event is None:
+                    event = self._blocking[location] = {
+                        "location": location,
+                        "count": 0,
+                        "max_ms": 0.0,
+                        "stack": [f"{f.filename}:{f.lineno} in {f.name}" for f in stack[-8:]],
+                    }
+                # 同一次阻塞只计数一次，持续期间更新最长阻塞时间
+                if reported != heartbeat:
+                    event["count"] += 1
+                    reported = heartbeat
+                event["max_ms"] = max(event["max_ms"], blocked * 1000)
+
+    def start(self) -> None:
+        """在当前事件循环中开始采样"""
+        if self._task is not None:
+            return
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        if self.detect_blocking:
+            self._loop_thread = threading.get_ident()
+            self._watchdog_stop.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="temp-mail-lag-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        """停止采样"""
+        if self._watchdog is not None:
+            self._watchdog_stop.set()
+            self._watchdog.join()
+            self._watchdog = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def blocking_calls(self) -> list[dict]:
+        """阻塞事件循环的调用位置，按最长阻塞时间降序排列"""
+        with self._blocking_lock:
+            events = [dict(e) for e in self._blocking.values()]
+        return sorted(events, key=lambda e: e["max_ms"], reverse=True)
+
+    def stats(self) -> dict:
+        """最近样本的延迟分位数（毫秒）"""
+        samples = list(self.samples)
+        return {
+            "lag_p50_ms": percentile(samples, 0.5) * 1000,
+            "lag_p99_ms": percentile(samples, 0.99) * 1000,
+            "lag_max_ms": self.max_lag * 1000,
+            "blocking_calls": sum(e["count"] for e in self.blocking_calls()),
+        }
+
+
+def _retained_bytes(client: object) -> tuple[int, int]:
+    # email_list 和 mail_map 可能引用同一批 MailData，按对象去重
+    mails = {}
+    for mail in getattr(client, "email_list", ()):
+        mails[id(mail)] = mail
+    for mail in getattr(client, "mail_map", {}).values():
+        mails[id(mail)] = mail
+    size = 0
+    for mail in mails.values():
+        size += sys.getsizeof(mail) + sum(sys.getsizeof(v) for v in vars(mail).values())
+    return len(mails), size
+
+
+class _Usage:
+    __slots__ = ("requests", "bytes_downloaded", "last_request")
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes_downloaded = 0
+        self.last_request = 0.0
+
+
+class MailboxAccounting:
+    """按邮箱统计资源使用：请求数、下载字节数、滞留的邮件数和内存
+
+    请求数和下载字节数由传输层在 http_client(owner) 内发起请求时记录；
+    滞留的邮件数和内存在查询时根据 email_list / mail_map 计算。
+    邮箱客户端被回收后其统计随之删除。
+    """
+
+    def __init__(self):
+        self._usage: "weakref.WeakKeyDictionary[object, _Usage]" = weakref.WeakKeyDictionary()
+        self.unattributed = _Usage()
+
+    def _get(self, owner: Optional[object]) -> _Usage:
+        if owner is None:
+            return self.unattributed
+        usage = self._usage.get(owner)
+        if usage is None:
+            usage = self._usage[owner] = _Usage()
+        return usage
+
+    def record_request(self, owner: Optional[object]) -> None:
+        usage = self._get(owner)
+        usage.requests += 1
+        usage.last_request = time.time()
+
+    def record_bytes(self, owner: Optional[object], size: int) -> None:
+        self._get(owner).bytes_downloaded += size
+
+    def usage(self, client: object) -> dict:
+        """单个邮箱的资源使用"""
+        usage = self._usage.get(client) or _Usage()
+        messages, retained = _retained_bytes(client)
+        return {
+            "provider": type(client).__name__,
+            "address": getattr(client, "email_address", None),
+            "requests": usage.requests,
+            "bytes_downloaded": usage.bytes_downloaded,
+            "last_request": usage.last_request,
+            "messages_held": messages,
+            "ids_held": len(getattr(client, "mail_set", ())),
+            "bytes_retained": retained,
+        }
+
+    def clients(self) -> list[object]:
+        """有请求记录的邮箱客户端"""
+        return list(self._usage.keys())
+
+    def top(self, n: int = 10, by: str = "bytes_retained") -> list[tuple[object, dict]]:
+        """资源使用最多的邮箱，便于找出并销毁
+
+        Args:
+            n: 返回数量
+            by: 排序字段，如 bytes_retained、bytes_downloaded、requests、messages_held
+
+        Returns:
+            list[tuple[object, dict]]: 邮箱客户端及其资源使用
+        """
+        rows = [(client, self.usage(client)) for client in self.clients()]
+        rows.sort(key=lambda row: row[1][by], reverse=True)
+        return rows[:n]
+
+    def by_provider(self) -> dict[str, dict]:
+        """按服务商汇总的资源使用"""
+        totals: dict[str, dict] = {}
+        for client in self.clients():
+            usage = self.usage(client)
+            total = totals.setdefault(usage["provider"], {
+                "mailboxes": 0, "requests": 0, "bytes_downloaded": 0, "messages_held": 0, "bytes_retained": 0,
+            })
+            total["mailboxes"] += 1
+            for key in ("requests", "bytes_downloaded", "messages_held", "bytes_retained"):
+                total[key] += usage[key]
+        return totals
+
+
+_accounting: Optional[MailboxAccounting] = None
+
+
+def enable_accounting() -> MailboxAccounting:
+    """开启按邮箱统计，应在发起请求之前调用
+
+    Returns:
+        MailboxAccounting: 进程内的统计实例
+    """
+    global _accounting
+    if _accounting is None:
+        _accounting = MailboxAccounting()
+        set_usage_recorder(_accounting)
+    return _accounting
+
+
+def get_accounting() -> Optional[MailboxAccounting]:
+    """获取进程内的统计实例，未开启时返回 None"""
+    return _accounting
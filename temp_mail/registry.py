@@ -0,0 +1,134 @@
+import importlib
+import threading
+from typing import TYPE_CHECKING, Union
+
+if TYPE_CHECKING:
+    from temp_mail.client import MailClientABC
+
+# 第三方服务商通过该入口点组注册，值为 "模块:类名"
+ENTRY_POINT_GROUP = "temp_mail.providers"
+
+# `import temp_mail` 和命令行入口的导入耗时预算（毫秒），不包括解释器启动
+IMPORT_BUDGET_MS = 20.0
+IMPORT_BUDGET_MODULES = ("temp_mail", "temp_mail.cli")
+
+_BUILTIN_PROVIDERS: dict[str, str] = {
+    "mail_tm": "temp_mail.mail_tm:MailTM",
+    "mail_cx": "temp_mail.mail_cx:MailCX",
+    "tempmail_lol": "temp_mail.tempmail_lol:TempMailLOL",
+    "guerrilla_mail": "temp_mail.guerrilla_mail:GuerrillaMail",
+    "idatariver": "temp_mail.idatariver:IDataRiverClient",
+}
+
+_providers: dict[str, Union[str, type]] = dict(_BUILTIN_PROVIDERS)
+_entry_points_loaded = False
+_lock = threading.Lock()
+
+
+def _load_entry_points() -> None:
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    # importlib.metadata 导入较慢，只在首次查询服务商时导入
+    from importlib.metadata import entry_points
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+        _providers.setdefault(ep.name, ep.value)
+    _entry_points_loaded = True
+
+
+def register_provider(name: str, target: Union[str, type], replace: bool = False) -> None:
+    """注册服务商
+
+    Args:
+        name: 服务商名称
+        target: MailClientABC 子类，或 "模块:类名" 形式的字符串（首次使用时才导入）
+        replace: 是否覆盖同名服务商
+    """
+    with _lock:
+        _load_entry_points()
+        if name in _providers and not replace:
+            from temp_mail.client import MailClientError
+            raise MailClientError(f"服务商已存在: {name}")
+        _providers[name] = target
+
+
+def available_providers() -> list[str]:
+    """已注册的服务商名称，不会导入服务商模块"""
+    with _lock:
+        _load_entry_points()
+        return sorted(_providers)
+
+
+def get_provider_class(name: str) -> type["MailClientABC"]:
+    """获取服务商类，首次使用时导入其模块
+
+    Args:
+        name: 服务商名称
+
+    Raises:
+        MailClientError: 服务商不存在或无法导入
+    """
+    with _lock:
+        _load_entry_points()
+        target = _providers.get(name)
+        if target is None:
+            from temp_mail.client import MailClientError
+            raise MailClientError(f"未知的服务商: {name}，可选: {', '.join(sorted(_providers))}")
+        if isinstance(target, str):
+            module_name, _, attr = target.partition(":")
+            try:
+                target = getattr(importlib.import_module(module_name), attr)
+            except (ImportError, AttributeError) as e:
+                from temp_mail.client import MailClientError
+                raise MailClientError(f"导入服务商 {name} 失败: {str(e)}") from e
+            _providers[name] = target
+        return target
+
+
+def get_client(name: str, **opts) -> "MailClientABC":
+    """按名称创建服务商客户端
+
+    用法::
+
+        client = temp_mail.get_client("mail_tm")
+        client = temp_mail.get_client("idatariver", key="your_key")
+
+    Args:
+        name: 服务商名称
+        **opts: 传给服务商构造函数的参数
+    """
+    return get_provider_class(name)(**opts)
+
+
+def measure_import_time(module: str = "temp_mail") -> float:
+    """在新的解释器中测量导入模块的累计耗时
+
+    Returns:
+        float: 耗时（毫秒）
+
+    Raises:
+        MailClientError: 模块导入失败或输出中没有该模块的耗时
+    """
+    import os
+    import re
+    import subprocess
+    import sys
+
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    from temp_mail.client import MailClientError
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env,
+    )
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        raise MailClientError(f"导入 {module} 失败: {lines[-1] if lines else result.returncode}")
+    # 每行格式: "import time: self [us] | cumulative | imported package"
+    pattern = re.compile(rf"^import time:\s*\d+\s*\|\s*(\d+)\s*\|\s*{re.escape(module)}\s*$")
+    for line in result.stderr.splitlines():
+        m = pattern.match(line)
+        if m:
+            return int(m.group(1)) / 1000
+    # 模块已被解释器启动时导入等情况下没有对应的行，无法测量时不能视为通过
+    raise MailClientError(f"无法测量 {module} 的导入耗时")
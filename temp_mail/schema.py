@@ -0,0 +1,274 @@
+import dataclasses
+import json
+import re
+import time
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Optional, Union
+
+from temp_mail.client import MailClientError, MailData
+from temp_mail.tools import get_sha256_hash
+
+# 从 "Name <user@example.com>" 之类的字符串中提取邮箱地址
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+
+# 时间解析结果的缓存大小，同一封邮件在列表和详情中重复出现时不必重复解析
+TIMESTAMP_CACHE_SIZE = 4096
+
+
+def extract_address(value: Optional[str]) -> Optional[str]:
+    """提取字符串中的第一个邮箱地址，没有时返回 None"""
+    if not value:
+        return None
+    m = EMAIL_PATTERN.search(value)
+    return m.group() if m else None
+
+
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def parse_iso_timestamp(value: str) -> tuple[int, str]:
+    """解析 ISO 8601 时间，如 "2025-01-27T09:54:45+00:00"
+
+    Returns:
+        tuple[int, str]: 毫秒时间戳和 "%Y-%m-%d %H:%M:%S" 格式的时间
+    """
+    t = datetime.fromisoformat(value)
+    return int(t.timestamp() * 1000), t.strftime("%Y-%m-%d %H:%M:%S")
+
+
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def parse_nano_timestamp(value: str) -> tuple[int, str]:
+    """解析纳秒精度的 UTC 时间，如 "2025-01-27T07:27:25.711873584Z"，只保留到微秒
+
+    Returns:
+        tuple[int, str]: 毫秒时间戳和 "%Y-%m-%d %H:%M:%S" 格式的时间
+    """
+    # 与 strptime(value[:26], "%Y-%m-%dT%H:%M:%S.%f") 结果相同，fromisoformat 由 C 实现，快一个数量级
+    t = datetime.fromisoformat(value[:26])
+    return int(t.timestamp() * 1000), t.strftime("%Y-%m-%d %H:%M:%S")
+
+
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def parse_unix_timestamp(value: int) -> tuple[int, str]:
+    """解析秒级 Unix 时间戳，时间戳保持秒级
+
+    Returns:
+        tuple[int, str]: 原时间戳和 "%Y-%m-%d %H:%M:%S" 格式的时间
+    """
+    return value, datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class Field:
+    """从响应中取值的字段
+
+    Args:
+        path: 以 "." 分隔的路径，数字表示列表下标，如 "to.0.address"
+        parse: 对取到的值进行转换的函数
+    """
+
+    def __init__(self, path: str, parse: Optional[Callable[[Any], Any]] = None):
+        self.path = path
+        self.parse = parse
+
+
+class Arg:
+    """由调用方在转换时传入的字段，如响应中没有的收件地址
+
+    Args:
+        name: 参数名
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+Spec = Union[str, Field, Arg]
+
+# MailData 构造参数的顺序，md5 由调用方传入
+_FIELDS = tuple(f.name for f in dataclasses.fields(MailData) if f.name != "md5")
+
+
+class MailSchema:
+    """声明式的服务商响应 → MailData 字段映射
+
+    映射在首次使用时编译为一个普通的 Python 函数，字段访问直接展开为下标表达式，
+    不再逐个解释路径。``timestamp`` 给出时，其解析函数需返回 (date, createdAt)。
+
+    用法::
+
+        schema = MailSchema(
+            "mail_tm", id="id", from_="from.address", to="to.0.address", subject="subject",
+            body="text", html="html.0", timestamp=Field("createdAt", parse_iso_timestamp),
+        )
+        item = schema.convert(mail_data, md5_hash)
+        items = schema.convert_many(mail_list)
+
+    Args:
+        provider: 服务商名称，用于基准测试和错误信息
+        sample: 一条示例响应，用于基准测试
+        timestamp: 同时生成 date 和 createdAt 的字段
+        **fields: MailData 字段（md5 除外）到取值方式的映射
+    """
+
+    def __init__(self, provider: str, sample: Optional[dict] = None, timestamp: Optional[Field] = None,
+                 **fields: Spec):
+        unknown = set(fields) - set(_FIELDS)
+        if unknown:
+            raise MailClientError(f"未知的 MailData 字段: {', '.join(sorted(unknown))}")
+        required = set(_FIELDS) - ({"date", "createdAt"} if timestamp is not None else set())
+        missing = required - set(fields)
+        if missing:
+            raise MailClientError(f"缺少 MailData 字段: {', '.join(sorted(missing))}")
+        self.provider = provider
+        self.sample = sample
+        self.timestamp = timestamp
+        self.fields = fields
+        # Arg 字段按出现顺序成为转换函数的参数
+        self.args: list[str] = []
+        for spec in fields.values():
+            if isinstance(spec, Arg) and spec.name not in self.args:
+                self.args.append(spec.name)
+        self._convert: Optional[Callable[..., MailData]] = None
+        self.source = ""
+
+    @staticmethod
+    def _access(path: str) -> str:
+        expr = "data"
+        for key in path.split("."):
+            expr += f"[{key}]" if key.isdigit() else f"[{key!r}]"
+        return expr
+
+    def compile(self) -> Callable[..., MailData]:
+        """生成并缓存转换函数 ``convert(data, md5_hash, **args) -> MailData``"""
+        if self._convert is not None:
+            return self._convert
+        namespace: dict[str, Any] = {"MailData": MailData}
+        lines: list[str] = []
+
+        def emit(name: str, spec: Spec) -> str:
+            if isinstance(spec, Arg):
+                return spec.name
+            if isinstance(spec, str):
+                spec = Field(spec)
+            expr = self._access(spec.path)
+            if spec.parse is not None:
+                namespace[f"_parse_{name}"] = spec.parse
+                expr = f"_parse_{name}({expr})"
+            return expr
+
+        values = {}
+        if self.timestamp is not None:
+            lines.append(f"    ts = {emit('timestamp', self.timestamp)}")
+            values["date"], values["createdAt"] = "ts[0]", "ts[1]"
+        for name, spec in self.fields.items():
+            values[name] = emit(name, spec)
+        params = "".join(f", {a}" for a in self.args)
+        call = ", ".join(["md5_hash"] + [values[name] for name in _FIELDS])
+        source = "\n".join([f"def convert(data, md5_hash{params}):", *lines, f"    return MailData({call})", ""])
+        exec(compile(source, f"<MailSchema {self.provider}>", "exec"), namespace)
+        self.source = source
+        self._convert = namespace["convert"]
+        return self._convert
+
+    def convert(self, data: dict, md5_hash: str, **args) -> MailData:
+        """转换一条响应
+
+        Args:
+            data: 服务商返回的邮件数据
+            md5_hash: 邮件哈希
+            **args: Arg 字段的值
+        """
+        return self.compile()(data, md5_hash, **args)
+
+    def convert_many(self, items: Iterable[dict], **args) -> list[MailData]:
+        """批量转换整个列表响应，邮件哈希按 get_sha256_hash(json.dumps(item)) 计算
+
+        Args:
+            items: 服务商返回的邮件数据列表
+            **args: Arg 字段的值，对所有邮件相同
+        """
+        convert = self.compile()
+        dumps = json.dumps
+        if args:
+            return [convert(item, get_sha256_hash(dumps(item)), **args) for item in items]
+        return [convert(item, get_sha256_hash(dumps(item))) for item in items]
+
+    def benchmark(self, count: int = 10000, **args) -> dict:
+        """用 sample 测量转换速度
+
+        分别测量冷缓存（每条邮件的时间都不同）、热缓存，以及冷缓存下包含哈希计算的批量转换。
+
+        Args:
+            count: 转换的邮件数量
+            **args: Arg 字段的值
+
+        Returns:
+            dict: 每条邮件的平均耗时（微秒）
+        """
+        if self.sample is None:
+            raise MailClientError(f"服务商 {self.provider} 没有示例响应")
+        convert = self.compile()
+        hashed = get_sha256_hash(json.dumps(self.sample))
+        # 时间字段逐条不同，模拟新邮件到达时缓存不命中
+        cold = [self._with_timestamp(i) for i in range(count)]
+        for cache in (parse_iso_timestamp, parse_nano_timestamp, parse_unix_timestamp):
+            cache.cache_clear()
+        started = time.perf_counter()
+        for item in cold:
+            convert(item, hashed, **args)
+        cold_us = (time.perf_counter() - started) / count * 1e6
+        started = time.perf_counter()
+        for item in cold[:1] * count:
+            convert(item, hashed, **args)
+        warm_us = (time.perf_counter() - started) / count * 1e6
+        for cache in (parse_iso_timestamp, parse_nano_timestamp, parse_unix_timestamp):
+            cache.cache_clear()
+        started = time.perf_counter()
+        self.convert_many(cold, **args)
+        batch_us = (time.perf_counter() - started) / count * 1e6
+        return {
+            "provider": self.provider,
+            "count": count,
+            "convert_us": cold_us,
+            "convert_cached_us": warm_us,
+            "convert_many_us": batch_us,
+            "messages_per_s": 1e6 / batch_us if batch_us else 0.0,
+        }
+
+    def _with_timestamp(self, offset: int) -> dict:
+        item = json.loads(json.dumps(self.sample))
+        if self.timestamp is None:
+            return item
+        keys = [int(key) if key.isdigit() else key for key in self.timestamp.path.split(".")]
+        target = item
+        for key in keys[:-1]:
+            target = target[key]
+        value = target[keys[-1]]
+        if isinstance(value, int):
+            target[keys[-1]] = value + offset
+        else:
+            # 只改动 ISO 时间中的时分秒，保持原格式
+            h, m, sec = offset // 3600 % 24, offset // 60 % 60, offset % 60
+            target[keys[-1]] = f"{value[:11]}{h:02d}:{m:02d}:{sec:02d}{value[19:]}"
+        return item
+
+
+def benchmark(providers: Optional[Iterable[str]] = None, count: int = 10000) -> list[dict]:
+    """按服务商测量响应转换速度
+
+    Args:
+        providers: 服务商名称，默认测量所有带 schema 的已注册服务商
+        count: 每个服务商转换的邮件数量
+
+    Returns:
+        list[dict]: 每个服务商的测量结果
+    """
+    from temp_mail.registry import available_providers, get_provider_class
+
+    results = []
+    for name in providers or available_providers():
+        schema = getattr(get_provider_class(name), "schema", None)
+        if schema is None or schema.sample is None:
+            continue
+        args = {name: f"sample-{name}" for name in schema.args}
+        results.append(schema.benchmark(count, **args))
+    return results
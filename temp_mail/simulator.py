@@ -0,0 +1,420 @@
+import asyncio
+import json
+import multiprocessing
+import random
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import parse_qs
+
+from temp_mail.client import MailClientError
+
+_mp = multiprocessing.get_context("spawn")
+
+_REASONS = {200: "OK", 201: "Created", 204: "No Content", 304: "Not Modified", 400: "Bad Request",
+            401: "Unauthorized", 404: "Not Found", 429: "Too Many Requests", 500: "Internal Server Error"}
+
+
+class _Account:
+    def __init__(self, account_id: str, address: str, password: str):
+        self.id = account_id
+        self.address = address
+        self.password = password
+        self.token = secrets.token_hex(16)
+        self.messages: dict[str, dict] = {}
+        self.version = 0
+
+
+class _SimulatedService:
+    """本地模拟服务的公共部分：HTTP/1.1 服务、邮件投递和故障注入
+
+    子类实现 ``_route`` 和 ``_message``，并以类属性 ``provider`` 声明对应的服务商名称。
+
+    Args:
+        host: 监听地址
+        port: 监听端口，0 表示随机端口
+        mail_rate: 每秒向随机邮箱投递的邮件数
+        latency: 每个请求附加的平均延迟（秒），按指数分布抖动
+        error_rate: 返回 500 的请求比例
+        throttle_rate: 返回 429 的请求比例
+        drop_rate: 直接断开连接的请求比例
+        etag: 收件列表是否支持 ETag 条件请求
+        body_size: 邮件正文大小（字节）
+        max_messages: 每个邮箱保留的邮件数，超出时丢弃最早的邮件，与真实服务的邮件过期相当
+        seed: 随机数种子
+    """
+
+    provider = ""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, mail_rate: float = 1.0, latency: float = 0.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0, drop_rate: float = 0.0,
+                 etag: bool = True, body_size: int = 2048, max_messages: int = 100, seed: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.mail_rate = mail_rate
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.drop_rate = drop_rate
+        self.etag = etag
+        self.body_size = body_size
+        self.max_messages = max_messages
+        self.random = random.Random(seed)
+        self.domain = "sim.test"
+        self.accounts: dict[str, _Account] = {}
+        self._by_token: dict[str, _Account] = {}
+        self._by_address: dict[str, _Account] = {}
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._server: Optional[asyncio.Server] = None
+        self._injector: Optional[asyncio.Task] = None
+        self.requests = 0
+        self.injected_errors = 0
+        self.mails_injected = 0
+        self.open_connections = 0
+        self.peak_connections = 0
+
+    @property
+    def url(self) -> str:
+        """服务地址"""
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        """启动服务和邮件投递任务"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._injector = asyncio.create_task(self._inject())
+
+    async def stop(self) -> None:
+        """停止服务"""
+        if self._injector is not None:
+            self._injector.cancel()
+            try:
+                await self._injector
+            except asyncio.CancelledError:
+                pass
+            self._injector = None
+        if self._server is not None:
+            self._server.close()
+            # Python 3.12+ 的 wait_closed() 会等待所有连接断开，客户端持有的保持连接需要主动关闭
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "_SimulatedService":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.stop()
+
+    def stats(self) -> dict:
+        """服务端统计"""
+        return {
+            "server_requests": self.requests,
+            "server_injected_errors": self.injected_errors,
+            "server_mails": self.mails_injected,
+            "server_accounts": len(self.accounts),
+            "server_connections": self.open_connections,
+            "server_peak_connections": self.peak_connections,
+        }
+
+    def deliver(self, account: _Account) -> None:
+        """向邮箱投递一封邮件"""
+        mail_id = secrets.token_hex(12)
+        account.messages[mail_id] = self._message(account, mail_id)
+        while len(account.messages) > self.max_messages:
+            del account.messages[next(iter(account.messages))]
+        account.version += 1
+        self.mails_injected += 1
+
+    async def _inject(self) -> None:
+        pending = 0.0
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(0.05)
+            now = time.monotonic()
+            pending += (now - last) * self.mail_rate
+            last = now
+            if not self.accounts:
+                continue
+            accounts = list(self.accounts.values())
+            while pending >= 1:
+                pending -= 1
+                self.deliver(self.random.choice(accounts))
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.open_connections += 1
+        self.peak_connections = max(self.peak_connections, self.open_connections)
+        self._writers.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                length = int(headers.get("content-length", "0"))
+                body = await reader.readexactly(length) if length else b""
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.random.expovariate(1 / self.latency))
+                roll = self.random.random()
+                if roll < self.drop_rate:
+                    self.injected_errors += 1
+                    break
+                roll -= self.drop_rate
+                if roll < self.error_rate:
+                    self.injected_errors += 1
+                    status, payload, extra = 500, {"detail": "simulated error"}, {}
+                elif roll - self.error_rate < self.throttle_rate:
+                    self.injected_errors += 1
+                    status, payload, extra = 429, {"detail": "simulated throttle"}, {}
+                else:
+                    path, _, query = target.partition("?")
+                    params = {k: v[0] for k, v in parse_qs(query).items()}
+                    status, payload, extra = self._route(method, path, params, headers, body)
+                data = b"" if payload is None else json.dumps(payload).encode()
+                head = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}", f"Content-Length: {len(data)}",
+                        "Content-Type: application/json"]
+                head += [f"{k}: {v}" for k, v in extra.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self.open_connections -= 1
+            self._writers.discard(writer)
+            writer.close()
+
+    def _add_account(self, address: str, password: str) -> _Account:
+        account = _Account(secrets.token_hex(12), address, password)
+        self.accounts[account.id] = account
+        self._by_token[account.token] = account
+        self._by_address[account.address] = account
+        return account
+
+    def _message(self, account: _Account, mail_id: str) -> dict:
+        raise NotImplementedError
+
+    def _route(self, method: str, path: str, params: dict, headers: dict,
+               body: bytes) -> tuple[int, Optional[dict], dict]:
+        raise NotImplementedError
+
+
+class SimulatedMailTM(_SimulatedService):
+    """本地模拟的 Mail.tm 服务，用于压测和浸泡测试
+
+    实现 MailTM 客户端用到的接口（/domains、/accounts、/token、/messages），
+    按配置的速率向已创建的邮箱投递邮件，并可注入延迟、错误、限流和断连。
+    收件列表只包含摘要，邮件内容逐封请求。客户端把 api_url 指向 ``url`` 即可使用。
+    参数见 _SimulatedService。
+    """
+
+    provider = "mail_tm"
+
+    def _message(self, account: _Account, mail_id: str) -> dict:
+        return {
+            "id": mail_id,
+            "createdAt": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "from": {"address": "noreply@sender.test", "name": "Sender"},
+            "to": [{"address": account.address, "name": ""}],
+            "subject": f"Your code is {self.random.randint(100000, 999999)}",
+            "text": "x" * self.body_size,
+            "html": [f"<p>{'x' * self.body_size}</p>"],
+        }
+
+    def _route(self, method: str, path: str, params: dict, headers: dict,
+               body: bytes) -> tuple[int, Optional[dict], dict]:
+        if method == "GET" and path == "/domains":
+            return 200, {"hydra:member": [{"domain": self.domain}]}, {}
+        if method == "POST" and path == "/accounts":
+            data = json.loads(body)
+            account = self._add_account(data["address"], data["password"])
+            return 201, {"id": account.id, "address": account.address}, {}
+        if method == "POST" and path == "/token":
+            data = json.loads(body)
+            account = self._by_address.get(data["address"])
+            if account is not None and account.password == data["password"]:
+                return 200, {"id": account.id, "token": account.token}, {}
+            return 401, {"detail": "invalid credentials"}, {}
+        token = headers.get("authorization", "").removeprefix("Bearer ")
+        account = self._by_token.get(token)
+        if account is None:
+            return 401, {"detail": "unauthorized"}, {}
+        if method == "GET" and path == "/messages":
+            etag = f'"{account.id}-{account.version}"'
+            if self.etag and headers.get("if-none-match") == etag:
+                return 304, None, {"ETag": etag}
+            members = [{"id": m["id"], "subject": m["subject"]} for m in account.messages.values()]
+            return 200, {"hydra:member": members}, ({"ETag": etag} if self.etag else {})
+        if method == "GET" and path.startswith("/messages/"):
+            message = account.messages.get(path.rsplit("/", 1)[1])
+            if message is None:
+                return 404, {"detail": "not found"}, {}
+            return 200, message, {}
+        if method == "DELETE" and path == f"/accounts/{account.id}":
+            del self.accounts[account.id]
+            del self._by_token[account.token]
+            self._by_address.pop(account.address, None)
+            return 204, None, {}
+        return 404, {"detail": "not found"}, {}
+
+
+class SimulatedTempMailLOL(_SimulatedService):
+    """本地模拟的 TempMail.lol 服务，用于压测和浸泡测试
+
+    实现 TempMailLOL 客户端用到的接口（/v2/inbox/create、/v2/inbox）。
+    与 Mail.tm 不同，收件列表直接包含每封邮件的完整内容，每次变化都要重新下载整个列表，
+    可用于观察大列表响应的下载量、大小上限和内存。服务没有删除接口，邮箱一直保留到模拟服务停止。
+    参数见 _SimulatedService。
+    """
+
+    provider = "tempmail_lol"
+
+    def _message(self, account: _Account, mail_id: str) -> dict:
+        now = datetime.now(timezone.utc)
+        return {
+            "_id": mail_id,
+            "from": "noreply@sender.test",
+            "to": account.address,
+            "subject": f"Your code is {self.random.randint(100000, 999999)}",
+            "body": "x" * self.body_size,
+            "html": f"<p>{'x' * self.body_size}</p>",
+            "date": int(now.timestamp() * 1000),
+            "createdAt": now.isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+        }
+
+    def _route(self, method: str, path: str, params: dict, headers: dict,
+               body: bytes) -> tuple[int, Optional[dict], dict]:
+        if method == "POST" and path == "/v2/inbox/create":
+            account = self._add_account(f"{secrets.token_hex(5)}@{self.domain}", "")
+            return 201, {"address": account.address, "token": account.token}, {}
+        if method == "GET" and path == "/v2/inbox":
+            account = self._by_token.get(params.get("token", ""))
+            if account is None:
+                return 200, {"emails": [], "expired": True}, {}
+            etag = f'"{account.id}-{account.version}"'
+            if self.etag and headers.get("if-none-match") == etag:
+                return 304, None, {"ETag": etag}
+            payload = {"emails": list(account.messages.values()), "expired": False}
+            return 200, payload, ({"ETag": etag} if self.etag else {})
+        return 404, {"error": "not found"}, {}
+
+
+# 可模拟的服务商名称到模拟服务的映射
+SIMULATORS: dict[str, type[_SimulatedService]] = {
+    SimulatedMailTM.provider: SimulatedMailTM,
+    SimulatedTempMailLOL.provider: SimulatedTempMailLOL,
+}
+
+
+def _serve(conn, provider: str, options: dict) -> None:
+    # 子进程入口：事件循环运行在后台线程，主线程处理父进程的 stats / stop 请求
+    simulator = SIMULATORS[provider](**options)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(simulator.start(), loop).result()
+    conn.send(simulator.port)
+    try:
+        while True:
+            try:
+                command = conn.recv()
+            except EOFError:
+                break
+            if command == "stats":
+                conn.send(simulator.stats())
+            elif command == "stop":
+                break
+    finally:
+        asyncio.run_coroutine_threadsafe(simulator.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        try:
+            conn.send("stopped")
+        except (BrokenPipeError, OSError):
+            pass
+
+
+class SimulatorProcess:
+    """在独立进程中运行的模拟服务
+
+    压测时服务端与被测客户端分开，事件循环延迟、文件描述符和内存等指标只反映客户端本身。
+    接口与 SimulatedMailTM 的 start / stop / stats / url / provider 相同。
+
+    Args:
+        provider: 模拟的服务商，见 SIMULATORS
+        **options: 模拟服务的参数，见 _SimulatedService
+    """
+
+    def __init__(self, provider: str = "mail_tm", **options):
+        if provider not in SIMULATORS:
+            raise MailClientError(f"不支持模拟的服务商: {provider}")
+        self.provider = provider
+        self.options = options
+        self.host = options.get("host", "127.0.0.1")
+        self.port = options.get("port", 0)
+        self._conn = None
+        self._process: Optional[multiprocessing.process.BaseProcess] = None
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        """服务地址"""
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        """启动子进程，等待服务开始监听"""
+        parent_conn, child_conn = _mp.Pipe()
+        self._process = _mp.Process(target=_serve, args=(child_conn, self.provider, self.options),
+                                    name="temp-mail-simulator", daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self.port = await asyncio.to_thread(parent_conn.recv)
+
+    def stats(self) -> dict:
+        """服务端统计"""
+        with self._lock:
+            self._conn.send("stats")
+            return self._conn.recv()
+
+    async def stop(self) -> None:
+        """停止服务并等待子进程退出"""
+        if self._process is None:
+            return
+
+        def stop() -> None:
+            with self._lock:
+                try:
+                    self._conn.send("stop")
+                    self._conn.recv()
+                except (EOFError, BrokenPipeError, OSError):
+                    pass
+            self._process.join(10)
+            if self._process.is_alive():
+                self._process.kill()
+                self._process.join()
+            self._conn.close()
+
+        await asyncio.to_thread(stop)
+        self._process = None
+
+    async def __aenter__(self) -> "SimulatorProcess":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.stop()
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Coroutine, Optional, TypeVar
+
+from temp_mail.client import MailClientABC, MailData, MailClientError
+from temp_mail.transport import aclose_async_client
+
+T = TypeVar("T")
+
+
+class BackgroundLoop:
+    """在后台线程中运行的常驻事件循环
+
+    所有同步调用都被投递到同一个事件循环中执行，
+    因此可以复用同一个连接池，而无需每次调用 asyncio.run() 重建事件循环。
+    """
+
+    def __init__(self, name: str = "temp-mail-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """获取后台事件循环，首次访问时启动后台线程"""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                started = threading.Event()
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._loop, started), name=self.name, daemon=True
+                )
+                self._thread.start()
+                started.wait()
+            return self._loop
+
+    @staticmethod
+    def _run(loop: asyncio.AbstractEventLoop, started: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        loop.call_soon(started.set)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> Future[T]:
+        """投递协程到后台事件循环，立即返回 Future"""
+        loop = self.loop
+        if self._thread is threading.current_thread():
+            coro.close()
+            raise MailClientError("不能在后台事件循环线程内同步等待，请直接 await 异步接口")
+        return asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """在后台事件循环中执行协程并阻塞等待结果
+
+        超时后协程会被取消，不会继续在后台占用邮箱的锁。
+        """
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError as e:
+            future.cancel()
+            raise MailClientError(f"等待后台事件循环超时: {timeout} 秒") from e
+
+    def stop(self) -> None:
+        """关闭共享连接池并停止后台事件循环"""
+        if self._thread is threading.current_thread():
+            raise MailClientError("不能在后台事件循环线程内停止事件循环")
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop, self._thread = None, None
+        if loop is None or loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(aclose_async_client(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join()
+
+
+_default_loop = BackgroundLoop()
+
+
+def get_background_loop() -> BackgroundLoop:
+    """获取进程内默认的后台事件循环"""
+    return _default_loop
+
+
+class SyncMailClient:
+    """MailClientABC 的线程安全同步封装
+
+    可以被多个工作线程同时调用。同一个邮箱上的调用会被串行化，
+    不同邮箱之间在后台事件循环中并发执行并共享连接池。
+
+    用法::
+
+        client = SyncMailClient(MailTM())
+        address = client.get_email_address()
+        emails = client.get_email_list()
+        client.destroy()
+    """
+
+    def __init__(self, client: MailClientABC, loop: Optional[BackgroundLoop] = None,
+                 timeout: Optional[float] = None):
+        self.client = client
+        self.runner = loop or get_background_loop()
+        self.timeout = timeout
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def _call(self, name: str, *args, **kwargs):
+        # 锁在后台事件循环内创建，保证同一邮箱的操作不会交错执行
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            return await getattr(self.client, name)(*args, **kwargs)
+
+    def call(self, name: str, *args, **kwargs) -> Any:
+        """同步调用被封装客户端的任意异步方法
+
+        Args:
+            name: 异步方法名
+        """
+        return self.runner.run(self._call(name, *args, **kwargs), self.timeout)
+
+    def get_email_address(self) -> str:
+        """获取临时邮箱地址"""
+        return self.call("get_email_address")
+
+    def get_email_list(self) -> list[MailData]:
+        """获取邮箱收件列表"""
+        return self.call("get_email_list")
+
+    def destroy(self) -> None:
+        """销毁客户端资源"""
+        return self.call("destroy")
+
+    def __enter__(self) -> "SyncMailClient":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.destroy()
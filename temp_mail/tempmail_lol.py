@@ -1,12 +1,12 @@
 import asyncio
-import json
 import time
 from typing import Optional
 
 import httpx
 
 from temp_mail.client import MailClientABC, MailData, MailClientError
-from temp_mail.tools import get_sha256_hash
+from temp_mail.schema import MailSchema
+from temp_mail.transport import http_client, ConditionalPoller, DEFAULT_MAX_BYTES
 
 
 class TempMailLOL(MailClientABC):
@@ -15,6 +15,28 @@ class TempMailLOL(MailClientABC):
     实现基于 https://tempmail.lol/zh/api 的临时邮箱服务
     """
 
+    schema = MailSchema(
+        "tempmail_lol",
+        id="_id",
+        from_="from",
+        to="to",
+        subject="subject",
+        date="date",
+        body="body",
+        html="html",
+        createdAt="createdAt",
+        sample={
+            "_id": "6798f1ae3c8b2a0012a4d5e6",
+            "from": "noreply@example.com",
+            "to": "user@example.com",
+            "subject": "Your verification code is 123456",
+            "body": "Your verification code is 123456",
+            "html": "<p>Your verification code is <b>123456</b></p>",
+            "date": 1738078638000,
+            "createdAt": "2025-01-28T15:37:18.000Z",
+        },
+    )
+
     def __init__(self):
         """初始化临时邮箱客户端"""
         self.api_url: str = "https://api.tempmail.lol"
@@ -28,6 +50,9 @@ class TempMailLOL(MailClientABC):
         self.email_list: list[MailData] = []
         self.mail_map: dict[str, MailData] = {}
         self.mail_set: set[str] = set()
+        self.poller = ConditionalPoller()
+        # 收件列表包含所有邮件的完整内容，整个列表响应按此上限读取
+        self.max_message_bytes: Optional[int] = DEFAULT_MAX_BYTES
 
     async def get_email_address(self) -> str:
         """获取临时邮箱地址
@@ -41,7 +66,7 @@ class TempMailLOL(MailClientABC):
         url = f"{self.api_url}/v2/inbox/create"
 
         try:
-            async with httpx.AsyncClient() as client:
+            async with http_client(self) as client:
                 response = await client.post(
                     url,
                     headers=self.headers,
@@ -79,36 +104,33 @@ class TempMailLOL(MailClientABC):
             "token": token
         }
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
+            async with http_client(self) as client:
+                response = await self.poller.get(
+                    client,
                     url,
+                    self.max_message_bytes,
                     params=params,
                     headers=self.headers,
                     timeout=30.0
                 )
-                response.raise_for_status()
+                if response is None:
+                    # 收件列表没有变化
+                    return self.email_list
                 data = response.json()
                 if data["expired"]:
                     raise MailClientError("邮箱已过期")
                 if len(data["emails"]):
+                    # 收件列表包含完整邮件，只转换未见过的邮件
+                    new_emails = []
                     for email in data["emails"]:
-                        md5_hash = get_sha256_hash(json.dumps(email))
-                        item = MailData(
-                            md5=md5_hash,
-                            id=email["_id"],
-                            from_=email["from"],
-                            to=email["to"],
-                            subject=email["subject"],
-                            date=email["date"],
-                            body=email["body"],
-                            html=email["html"],
-                            createdAt=email["createdAt"]
-                        )
-                        if item.id not in self.mail_set:
-                            self.mail_set.add(item.id)
-                            self.email_list.append(item)
-                            self.mail_map[item.id] = item
-                            # print(f"TempMailLOL 获取邮箱收件列表成功，email_id: {item.id}")
+                        if email["_id"] not in self.mail_set:
+                            self.mail_set.add(email["_id"])
+                            new_emails.append(email)
+                    for item in self.schema.convert_many(new_emails):
+                        self.email_list.append(item)
+                        self.mail_map[item.id] = item
+                        # print(f"TempMailLOL 获取邮箱收件列表成功，email_id: {item.id}")
+                self.poller.commit(response)
         except httpx.HTTPStatusError as e:
             raise MailClientError(
                 f"获取邮箱收件列表失败，HTTP状态码: {e.response.status_code}, 详情: {e.response.text}") from e
@@ -1,10 +1,13 @@
+import asyncio
 import hashlib
 import secrets
 import string
+import time
 
 import httpx
 
 from temp_mail.client import MailClientError
+from temp_mail.transport import http_client
 
 
 def generate_secure_random_string(length=10):
@@ -20,9 +23,9 @@ def get_sha256_hash(data_string: str) -> str:
     sha256_hash = hashlib.sha256(encoded_data).hexdigest()
     return sha256_hash
 
-async def destroy_mail(mail_address: str,url:str,header:dict) -> None:
+async def destroy_mail(mail_address: str,url:str,header:dict,owner=None) -> None:
     try:
-        async with httpx.AsyncClient() as client:
+        async with http_client(owner) as client:
             response = await client.delete(
                 url,
                 headers=header,
@@ -36,4 +39,35 @@ async def destroy_mail(mail_address: str,url:str,header:dict) -> None:
     except httpx.RequestError as e:
         raise MailClientError(f"销毁邮箱地址请求失败: {str(e)}") from e
     except Exception as e:
-        raise MailClientError(f"销毁邮箱地址发生未知错误: {str(e)}") from e
\ No newline at end of file
+        raise MailClientError(f"销毁邮箱地址发生未知错误: {str(e)}") from e
+
+class RateLimiter:
+    """异步令牌桶限速器
+
+    Args:
+        rate: 每秒允许的请求数，None 或 0 表示不限速
+        burst: 桶容量，默认等于 rate
+    """
+
+    def __init__(self, rate: float | None, burst: float | None = None):
+        self.rate = rate or 0
+        self.capacity = burst or max(self.rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        """获取一个令牌，令牌不足时等待"""
+        if not self.rate:
+            return
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
@@ -0,0 +1,431 @@
+import asyncio
+import hashlib
+import inspect
+import os
+import weakref
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Iterable, Optional, Protocol, Union
+
+import httpx
+
+from temp_mail.client import MailClientError
+
+if TYPE_CHECKING:
+    from temp_mail.egress import EgressPool
+
+# 每个事件循环共享一个 httpx.AsyncClient，连接池不能跨事件循环复用
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_egress_pool: Optional["EgressPool"] = None
+# 创建底层传输层的工厂函数，参数为代理地址；None 表示使用 httpx 默认传输层
+TransportFactory = Callable[[Optional[str]], httpx.AsyncBaseTransport]
+_transport_factory: Optional[TransportFactory] = None
+# 每个客户端的连接池大小。同一连接池排队的请求过多时，httpcore 分配连接的开销随队列长度平方增长，
+# 会长时间阻塞事件循环，因此 http_client() 同时借出同一客户端的次数也以 max_connections 为上限
+DEFAULT_POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+_pool_limits: httpx.Limits = DEFAULT_POOL_LIMITS
+_request_slots: "weakref.WeakKeyDictionary[httpx.AsyncClient, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+# 正在关闭的旧客户端，保持引用直到关闭完成
+_closing: set[asyncio.Future] = set()
+
+
+def schedule_aclose(loop: asyncio.AbstractEventLoop, clients: Iterable[httpx.AsyncClient]) -> None:
+    """在客户端所属的事件循环中关闭客户端，可以在任意线程调用
+
+    事件循环已关闭时其连接已不可用，直接丢弃。
+    """
+    clients = list(clients)
+    if not clients or loop.is_closed():
+        return
+
+    def close() -> None:
+        for client in clients:
+            task = loop.create_task(client.aclose())
+            _closing.add(task)
+            task.add_done_callback(_closing.discard)
+
+    try:
+        loop.call_soon_threadsafe(close)
+    except RuntimeError:
+        # 事件循环在检查之后被关闭
+        pass
+
+
+def _invalidate_clients() -> None:
+    # 传输层配置变化后，关闭所有已创建的共享客户端和出口客户端，下次请求时按新配置重建
+    for loop, client in list(_clients.items()):
+        schedule_aclose(loop, [client])
+    _clients.clear()
+    if _egress_pool is not None:
+        _egress_pool.invalidate()
+
+
+def set_transport_factory(factory: Optional[TransportFactory]) -> None:
+    """设置创建底层传输层的工厂函数，用于录制/回放等场景
+
+    已创建的共享客户端和出口客户端会被关闭，之后的请求使用新的传输层。
+    """
+    global _transport_factory
+    _transport_factory = factory
+    _invalidate_clients()
+
+
+def set_pool_limits(max_connections: Optional[int] = 100, max_keepalive_connections: Optional[int] = 20) -> None:
+    """设置每个共享客户端和出口客户端的连接池大小
+
+    http_client() 同时借出同一客户端的次数以 max_connections 为上限，超出的协程排队等待。
+    已创建的客户端会被关闭，之后的请求使用新的设置。
+
+    Args:
+        max_connections: 最大连接数，None 表示不限制（同时也不限制借出次数）
+        max_keepalive_connections: 最大空闲保持连接数
+    """
+    global _pool_limits
+    _pool_limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections)
+    _invalidate_clients()
+
+
+def get_pool_limits() -> httpx.Limits:
+    """获取当前的连接池大小"""
+    return _pool_limits
+
+
+def get_transport_factory() -> Optional[TransportFactory]:
+    """获取当前的传输层工厂函数"""
+    return _transport_factory
+
+
+# 当前请求所属的邮箱客户端，由 http_client(owner) 设置
+_current_owner: ContextVar[Optional[object]] = ContextVar("temp_mail_owner", default=None)
+
+
+class UsageRecorder(Protocol):
+    """按邮箱记录请求数和下载字节数"""
+
+    def record_request(self, owner: Optional[object]) -> None:
+        ...
+
+    def record_bytes(self, owner: Optional[object], size: int) -> None:
+        ...
+
+
+_usage_recorder: Optional[UsageRecorder] = None
+
+
+def set_usage_recorder(recorder: Optional[UsageRecorder]) -> None:
+    """设置按邮箱统计资源使用的记录器
+
+    已创建的共享客户端和出口客户端会被关闭，之后的请求才会被统计，应在发起请求之前设置。
+    """
+    global _usage_recorder
+    _usage_recorder = recorder
+    _invalidate_clients()
+
+
+class _CountingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, recorder: UsageRecorder, owner: Optional[object]):
+        self.stream = stream
+        self.recorder = recorder
+        self.owner = owner
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.stream:
+            self.recorder.record_bytes(self.owner, len(chunk))
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self.stream.aclose()
+
+
+class _AccountingTransport(httpx.AsyncBaseTransport):
+    """把请求数和实际下载的字节数记到发起请求的邮箱上"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, recorder: UsageRecorder):
+        self.transport = transport
+        self.recorder = recorder
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        owner = _current_owner.get()
+        self.recorder.record_request(owner)
+        response = await self.transport.handle_async_request(request)
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=_CountingStream(response.stream, self.recorder, owner),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def _no_cookies() -> CookieJar:
+    # 共享客户端被多个邮箱复用，不能保存响应中的 Cookie，否则新邮箱会带上其他邮箱的会话；
+    # 会话状态只通过各服务商显式传入的请求头携带
+    return CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+
+
+def new_async_client(proxy: Optional[str] = None, **kwargs) -> httpx.AsyncClient:
+    """按当前传输层配置创建 httpx.AsyncClient
+
+    客户端不保存 Cookie，见 ``_no_cookies``。
+
+    Args:
+        proxy: 代理地址，None 表示直连
+    """
+    kwargs.setdefault("cookies", _no_cookies())
+    kwargs.setdefault("limits", _pool_limits)
+    if _transport_factory is not None:
+        transport = _transport_factory(proxy)
+    elif _usage_recorder is not None:
+        transport = httpx.AsyncHTTPTransport(proxy=proxy, limits=kwargs.pop("limits"))
+    else:
+        return httpx.AsyncClient(proxy=proxy, **kwargs)
+    if _usage_recorder is not None:
+        transport = _AccountingTransport(transport, _usage_recorder)
+    return httpx.AsyncClient(transport=transport, **kwargs)
+
+
+def set_egress_pool(pool: Optional["EgressPool"]) -> None:
+    """设置进程内使用的出口池，None 表示所有请求使用默认出口"""
+    global _egress_pool
+    _egress_pool = pool
+
+
+def get_egress_pool() -> Optional["EgressPool"]:
+    """获取进程内使用的出口池"""
+    return _egress_pool
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """获取当前事件循环共享的 httpx.AsyncClient
+
+    Returns:
+        httpx.AsyncClient: 绑定到当前事件循环的共享客户端
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = new_async_client()
+        _clients[loop] = client
+    return client
+
+
+@asynccontextmanager
+async def http_client(owner: Optional[object] = None) -> AsyncIterator[httpx.AsyncClient]:
+    """以上下文管理器的形式借用共享客户端，退出时不关闭连接池
+
+    用法与 ``async with httpx.AsyncClient() as client`` 一致，
+    但同一事件循环内的所有请求复用同一个连接池。
+    同时借出同一客户端的次数不超过连接池的 max_connections（见 set_pool_limits），超出时排队等待。
+
+    Args:
+        owner: 发起请求的邮箱客户端，配置了出口池时按邮箱粘性分配出口
+    """
+    while True:
+        pool = _egress_pool
+        client = get_async_client() if pool is None or owner is None else pool.client_for(owner)
+        slots = _slots_for(client)
+        if slots is None:
+            break
+        await slots.acquire()
+        if not client.is_closed:
+            break
+        # 排队期间客户端因配置变化被关闭，换用新客户端
+        slots.release()
+    token = _current_owner.set(owner)
+    try:
+        yield client
+    finally:
+        _current_owner.reset(token)
+        if slots is not None:
+            slots.release()
+
+
+def _slots_for(client: httpx.AsyncClient) -> Optional[asyncio.Semaphore]:
+    slots = _request_slots.get(client)
+    if slots is None:
+        limit = _pool_limits.max_connections
+        if limit is None:
+            return None
+        slots = _request_slots[client] = asyncio.Semaphore(limit)
+    return slots
+
+
+async def aclose_async_client() -> None:
+    """关闭当前事件循环的共享客户端"""
+    loop = asyncio.get_running_loop()
+    client = _clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+    if _egress_pool is not None:
+        await _egress_pool.aclose()
+
+
+class ConditionalPoller:
+    """记录收件列表轮询的 ETag / Last-Modified 和响应内容摘要
+
+    服务端支持条件请求时，未变化的收件列表返回 304，不再下载响应体；
+    不支持时，如果响应体与上次成功处理的完全一致，也会跳过解析和转换。
+    每个邮箱客户端持有一个实例。
+    """
+
+    def __init__(self):
+        # url -> (etag, last_modified, digest)
+        self._states: dict[str, tuple[Optional[str], Optional[str], bytes]] = {}
+        self._pending: dict[str, tuple[Optional[str], Optional[str], bytes]] = {}
+
+    async def get(self, client: httpx.AsyncClient, url: str, max_bytes: Optional[int] = None,
+                  **kwargs) -> Optional[httpx.Response]:
+        """发送条件 GET 请求
+
+        Args:
+            client: httpx 客户端
+            url: 请求地址，其余参数与 client.get 相同
+            max_bytes: 响应体大小上限，None 表示不限制；收件列表包含完整邮件时应设置
+
+        Returns:
+            Optional[httpx.Response]: 收件列表与上次相同时返回 None
+
+        Raises:
+            httpx.HTTPStatusError: 响应状态码错误
+            MailClientError: 响应体超过大小上限
+        """
+        request = client.build_request("GET", url, **kwargs)
+        key = str(request.url)
+        state = self._states.get(key)
+        if state is not None:
+            etag, last_modified, _ = state
+            if etag:
+                request.headers["If-None-Match"] = etag
+            if last_modified:
+                request.headers["If-Modified-Since"] = last_modified
+        response = await _open_stream(client, request, max_bytes)
+        if response.status_code == 304 and state is not None:
+            await response.aclose()
+            return None
+        content = await _read_capped(response, max_bytes)
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        if state is not None and state[2] == digest:
+            return None
+        self._pending[key] = (response.headers.get("ETag"), response.headers.get("Last-Modified"), digest)
+        # 响应体已按大小上限读取并解码，重新构造一个不再带编码头的响应
+        return httpx.Response(
+            response.status_code,
+            headers=[(k, v) for k, v in response.headers.multi_items()
+                     if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")],
+            content=content,
+            request=request,
+        )
+
+    def commit(self, response: httpx.Response) -> None:
+        """响应处理成功后调用，之后相同的响应会被跳过
+
+        处理过程中出错时不调用，下次轮询会重新处理该响应。
+        """
+        key = str(response.request.url)
+        state = self._pending.pop(key, None)
+        if state is not None:
+            self._states[key] = state
+
+
+# 单封邮件详情响应的默认大小上限
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# 下载目标：文件路径、带 write 方法的对象（同步或异步），或接收数据块的函数（同步或异步）
+Sink = Union[str, os.PathLike, Any, Callable[[bytes], Any]]
+
+
+async def _open_stream(client: httpx.AsyncClient, request: httpx.Request, max_bytes: Optional[int]):
+    url = request.url
+    response = await client.send(request, stream=True)
+    if response.is_error:
+        # 错误响应体较小，读取后供调用方在异常信息中使用
+        await response.aread()
+        await response.aclose()
+        response.raise_for_status()
+    length = response.headers.get("Content-Length")
+    if max_bytes is not None and length and length.isdigit() and int(length) > max_bytes:
+        await response.aclose()
+        raise MailClientError(f"响应大小 {length} 字节超过上限 {max_bytes} 字节: {url}")
+    return response
+
+
+async def _read_capped(response: httpx.Response, max_bytes: Optional[int]) -> bytes:
+    buffer = bytearray()
+    try:
+        async for chunk in response.aiter_bytes(DEFAULT_CHUNK_SIZE):
+            buffer += chunk
+            if max_bytes is not None and len(buffer) > max_bytes:
+                raise MailClientError(f"响应大小超过上限 {max_bytes} 字节: {response.request.url}")
+    finally:
+        await response.aclose()
+    return bytes(buffer)
+
+
+async def fetch_capped(client: httpx.AsyncClient, url: str, max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+                       method: str = "GET", **kwargs) -> bytes:
+    """流式读取响应体，超过大小上限时立即中止
+
+    Args:
+        client: httpx 客户端
+        url: 请求地址，其余参数与 client.build_request 相同
+        max_bytes: 响应体大小上限，None 表示不限制
+
+    Returns:
+        bytes: 响应体
+
+    Raises:
+        httpx.HTTPStatusError: 响应状态码错误
+        MailClientError: 响应体超过大小上限
+    """
+    response = await _open_stream(client, client.build_request(method, url, **kwargs), max_bytes)
+    return await _read_capped(response, max_bytes)
+
+
+async def stream_to(client: httpx.AsyncClient, url: str, sink: Sink, max_bytes: Optional[int] = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, method: str = "GET", **kwargs) -> int:
+    """把响应体按块写入文件或调用方提供的目标，内存占用与响应大小无关
+
+    写入文件时超过大小上限会删除已写入的部分。
+
+    Args:
+        client: httpx 客户端
+        url: 请求地址，其余参数与 client.build_request 相同
+        sink: 文件路径、带 write 方法的对象，或接收数据块的函数
+        max_bytes: 大小上限，None 表示不限制
+        chunk_size: 每次读取的块大小
+
+    Returns:
+        int: 写入的字节数
+
+    Raises:
+        httpx.HTTPStatusError: 响应状态码错误
+        MailClientError: 响应体超过大小上限
+    """
+    path = os.fspath(sink) if isinstance(sink, (str, os.PathLike)) else None
+    f = open(path, "wb") if path is not None else None
+    write = f.write if f is not None else getattr(sink, "write", sink)
+    written = 0
+    try:
+        response = await _open_stream(client, client.build_request(method, url, **kwargs), max_bytes)
+        try:
+            async for chunk in response.aiter_bytes(chunk_size):
+                written += len(chunk)
+                if max_bytes is not None and written > max_bytes:
+                    raise MailClientError(f"响应大小超过上限 {max_bytes} 字节: {url}")
+                result = write(chunk)
+                if inspect.isawaitable(result):
+                    await result
+        finally:
+            await response.aclose()
+    except BaseException:
+        if f is not None:
+            f.close()
+            os.remove(path)
+        raise
+    if f is not None:
+        f.close()
+    return written